@@ -1,11 +1,55 @@
 import os
-from typing import TypedDict, Annotated
+from typing import Optional, TypedDict, Annotated
 
+from langchain_core.caches import InMemoryCache
+from langchain_core.globals import set_llm_cache
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.graph import StateGraph
 from langgraph.graph.message import add_messages
 
 
+# --- 0. Caché de respuestas del LLM ---
+# Con temperature=0 la misma pregunta produce la misma respuesta, así que no tiene
+# sentido pagar otra llamada a la API de Gemini. LangChain consulta la caché
+# global antes de hacer la petición HTTP. El backend se elige con la variable de
+# entorno AIPHA_LLM_CACHE: "sqlite" (por defecto), "redis", "memory", "semantic" o "none".
+def configure_llm_cache(backend: Optional[str] = None):
+    """
+    Configura la caché global de LLM de LangChain según el backend indicado.
+
+    No se llama al importar el módulo salvo que AIPHA_LLM_CACHE esté definida: el
+    backend por defecto crea '.langchain_cache.db' (o AIPHA_LLM_CACHE_PATH) en el
+    directorio actual. El backend "redis" requiere el extra opcional `redis`.
+    """
+    backend = (backend or os.environ.get("AIPHA_LLM_CACHE", "sqlite")).lower()
+    if backend == "none":
+        set_llm_cache(None)
+    elif backend == "memory":
+        set_llm_cache(InMemoryCache())
+    elif backend == "sqlite":
+        from langchain_community.cache import SQLiteCache
+        set_llm_cache(SQLiteCache(database_path=os.environ.get("AIPHA_LLM_CACHE_PATH", ".langchain_cache.db")))
+    elif backend == "redis":
+        # Para despliegues con varios procesos: todos comparten la caché de Redis
+        # (el servicio 'cache' de docker-compose.yml).
+        import redis
+        from langchain_community.cache import RedisCache
+        set_llm_cache(RedisCache(redis.Redis.from_url(os.environ.get("AIPHA_REDIS_URL", "redis://localhost:6379/0"))))
+    elif backend == "semantic":
+        # Reutiliza respuestas de preguntas parafraseadas (similitud coseno >= 0.92
+        # entre embeddings de Gemini). Solo aplica a llamadas con temperature=0.
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        from aipha.agents.base_agent.semantic_cache import SemanticCache
+        embeddings = GoogleGenerativeAIEmbeddings(model=os.environ.get("AIPHA_EMBEDDINGS_MODEL", "models/text-embedding-004"))
+        set_llm_cache(SemanticCache(embeddings, similarity_threshold=0.92, ttl_seconds=3600))
+    else:
+        raise ValueError(f"Backend de caché de LLM desconocido: '{backend}'")
+
+# Solo quien lo pide explícitamente (variable de entorno o punto de entrada) activa la caché.
+if os.environ.get("AIPHA_LLM_CACHE"):
+    configure_llm_cache()
+
+
 # --- 1. Definir el Estado del Agente ---
 # El estado es la "memoria" del agente. Es un diccionario
 # que viaja entre los nodos del grafo. TypedDict lo hace más estructurado.
@@ -53,6 +97,8 @@ app = workflow.compile()
 # --- 4. Ejecución de prueba (para verificar que el archivo funciona) ---
 if __name__ == "__main__":
     print("Ejecutando prueba del Base Agent...")
+    if not os.environ.get("AIPHA_LLM_CACHE"):
+        configure_llm_cache()
     
     # El input es un diccionario que coincide con la estructura de nuestro AgentState.
     estado_inicial = {"pregunta": "Explica qué es LangGraph en menos de 20 palabras."}
@@ -0,0 +1,134 @@
+# aipha/agents/base_agent/semantic_cache.py
+
+"""
+Caché semántica para las respuestas del LLM.
+
+La caché exacta de LangChain solo acierta si el prompt es idéntico carácter a
+carácter, así que paráfrasis como "Explica LangGraph" y "¿Qué es LangGraph?"
+vuelven a llamar a la API. Esta caché compara los embeddings de los prompts y
+reutiliza la respuesta si la similitud coseno supera un umbral.
+"""
+
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.embeddings import Embeddings
+
+
+class SemanticCache(BaseCache):
+    """
+    Caché en memoria indexada por similitud de embeddings.
+
+    Las entradas se separan por `llm_string` (modelo y parámetros), de modo que
+    solo se comparan prompts enviados al mismo LLM con la misma configuración.
+    Solo se cachean llamadas deterministas (temperature == 0): reutilizar una
+    respuesta muestreada con temperatura no tendría sentido.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        similarity_threshold: float = 0.92,
+        ttl_seconds: Optional[float] = 3600,
+        max_entries: int = 1000,
+    ):
+        """
+        Inicializa la caché semántica.
+
+        Args:
+            embeddings (Embeddings): Modelo usado para vectorizar los prompts.
+            similarity_threshold (float): Similitud coseno mínima para considerar un acierto.
+            ttl_seconds (Optional[float]): Tiempo de vida de cada entrada. None para no caducar.
+            max_entries (int): Máximo de entradas por `llm_string`; al superarlo se
+                descartan las más antiguas.
+        """
+        self._embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # llm_string -> lista de (embedding normalizado, instante de inserción, respuesta)
+        self._entries: Dict[str, List[Tuple[np.ndarray, float, RETURN_VAL_TYPE]]] = {}
+        # El último embedding calculado: un fallo en `lookup` va seguido de un
+        # `update` con el mismo prompt, y así no se vectoriza dos veces.
+        self._last_embedding: Optional[Tuple[str, np.ndarray]] = None
+        # Protege `_entries` y `_last_embedding`; la llamada al modelo de embeddings
+        # se hace fuera para no serializar las peticiones concurrentes.
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _is_deterministic(llm_string: str) -> bool:
+        """Indica si el LLM descrito por `llm_string` se invoca con temperature == 0."""
+        try:
+            params = json.loads(llm_string.split("---", 1)[0])
+            temperature = params.get("kwargs", {}).get("temperature")
+        except (ValueError, AttributeError):
+            return False
+        return temperature is not None and float(temperature) == 0.0
+
+    @staticmethod
+    def _prompt_text(prompt: str) -> str:
+        """Extrae el texto de los mensajes de un prompt de chat serializado."""
+        try:
+            messages = json.loads(prompt)
+            return "\n".join(m["kwargs"]["content"] for m in messages if isinstance(m["kwargs"]["content"], str))
+        except (ValueError, TypeError, KeyError):
+            return prompt
+
+    def _embed(self, prompt: str) -> np.ndarray:
+        with self._lock:
+            last = self._last_embedding
+        if last is not None and last[0] == prompt:
+            return last[1]
+        vector = np.asarray(self._embeddings.embed_query(self._prompt_text(prompt)), dtype=np.float64)
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector = vector / norm
+        with self._lock:
+            self._last_embedding = (prompt, vector)
+        return vector
+
+    def _purge_expired(self, entries: List[Tuple[np.ndarray, float, RETURN_VAL_TYPE]]):
+        """Descarta in situ las entradas caducadas (llamar con `_lock` tomado)."""
+        if entries and self.ttl_seconds is not None:
+            now = time.monotonic()
+            entries[:] = [e for e in entries if now - e[1] < self.ttl_seconds]
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        """Devuelve la respuesta cacheada más similar al prompt, si supera el umbral."""
+        if not self._is_deterministic(llm_string):
+            return None
+        with self._lock:
+            entries = self._entries.get(llm_string)
+            if entries:
+                self._purge_expired(entries)
+            if not entries:
+                return None
+            entries = list(entries)
+        vectors = np.stack([e[0] for e in entries])
+        similarities = vectors @ self._embed(prompt)
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.similarity_threshold:
+            return entries[best][2]
+        return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """Guarda la respuesta del LLM para el prompt dado."""
+        if not self._is_deterministic(llm_string):
+            return
+        vector = self._embed(prompt)
+        with self._lock:
+            entries = self._entries.setdefault(llm_string, [])
+            self._purge_expired(entries)
+            entries.append((vector, time.monotonic(), return_val))
+            if len(entries) > self.max_entries:
+                del entries[: len(entries) - self.max_entries]
+
+    def clear(self, **kwargs: Any) -> None:
+        """Vacía la caché."""
+        with self._lock:
+            self._entries.clear()
+            self._last_embedding = None
@@ -1,22 +1,23 @@
 # aipha/agents/data_fetching_agent/agent.py
 
+import asyncio
 import logging
-from typing import List, TypedDict
-from datetime import date, timedelta
+from typing import Any, Dict, List, TypedDict
+from datetime import date
 from pathlib import Path
 
+from langchain_core.tools import ToolException
 from langgraph.graph import StateGraph, END
 
 # Importamos todas las herramientas necesarias
-from aipha.agents.tools.fetcher_tool import fetch_binance_data
+from aipha.agents.tools.fetcher_tool import afetch_binance_data
 from aipha.agents.tools.data_processing_tool import process_historical_data
-from aipha.agents.tools.data_query_tool import query_klines_open_price
+from aipha.agents.tools.data_query_tool import query_klines_open_price, query_klines_open_price_from_files
 
 # Importamos la plantilla de datos (para la solicitud inicial)
 from aipha.data_system.templates.templates import KlinesDataRequestTemplate
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO) # Ajusta a DEBUG para ver más logs internos
 
 
 # --- 1. Definir el Estado del Agente (La Pizarra Compartida Expandida) ---
@@ -26,8 +27,8 @@ class AgentState(TypedDict):
     # Entradas para la descarga (se derivan de una KlinesDataRequestTemplate inicial)
     fetch_symbol: str
     fetch_interval: str
-    fetch_days_ago_start: int
-    fetch_days_ago_end: int
+    fetch_start_date: date
+    fetch_end_date: date
 
     # Entradas para la consulta (específicas para el precio de apertura)
     query_symbol: str
@@ -42,10 +43,13 @@ class AgentState(TypedDict):
 
 
 # --- 2. Definir los Nodos del Grafo ---
+# Los nodos son asíncronos: todo su trabajo es E/S (HTTP, disco, DuckDB), así que
+# con `ainvoke` las herramientas síncronas se ejecutan en un hilo del executor y
+# varias invocaciones del agente pueden compartir el mismo event loop.
 
-def execute_fetch_tool_node(state: AgentState) -> AgentState:
+async def execute_fetch_tool_node(state: AgentState) -> AgentState:
     """
-    Nodo encargado de ejecutar la herramienta 'fetch_binance_data'
+    Nodo encargado de ejecutar la herramienta 'afetch_binance_data'
     usando los parámetros de descarga del estado.
     """
     logger.info("DataFetchingAgent: Ejecutando nodo de descarga de datos...")
@@ -54,18 +58,18 @@ def execute_fetch_tool_node(state: AgentState) -> AgentState:
     tool_arguments = {
         "symbol": state["fetch_symbol"],
         "interval": state["fetch_interval"],
-        "days_ago_start": state["fetch_days_ago_start"],
-        "days_ago_end": state["fetch_days_ago_end"]
+        "start_date": state["fetch_start_date"],
+        "end_date": state["fetch_end_date"]
     }
     
     # Llamamos a la herramienta y actualizamos el estado
-    downloaded_files = fetch_binance_data.run(tool_arguments)
+    downloaded_files = await afetch_binance_data.ainvoke(tool_arguments)
     
     state["downloaded_files"] = downloaded_files
-    logger.info(f"DataFetchingAgent: Archivos descargados: {downloaded_files}")
+    logger.info("DataFetchingAgent: Archivos descargados: %s", downloaded_files)
     return state
 
-def execute_processing_tool_node(state: AgentState) -> AgentState:
+async def execute_processing_tool_node(state: AgentState) -> AgentState:
     """
     Nodo encargado de ejecutar la herramienta 'process_historical_data'
     usando los archivos descargados y el nombre de la DB del estado.
@@ -81,13 +85,13 @@ def execute_processing_tool_node(state: AgentState) -> AgentState:
     }
 
     # Llamamos a la herramienta y actualizamos el estado
-    processing_msg = process_historical_data.run(tool_arguments)
+    processing_msg = await process_historical_data.ainvoke(tool_arguments)
     
     state["processing_status"] = processing_msg
-    logger.info(f"DataFetchingAgent: Estado del procesamiento: {processing_msg}")
+    logger.info("DataFetchingAgent: Estado del procesamiento: %s", processing_msg)
     return state
 
-def execute_query_tool_node(state: AgentState) -> AgentState:
+async def execute_query_tool_node(state: AgentState) -> AgentState:
     """
     Nodo encargado de ejecutar la herramienta 'query_klines_open_price'
     usando los parámetros de consulta del estado.
@@ -103,19 +107,61 @@ def execute_query_tool_node(state: AgentState) -> AgentState:
     }
 
     # Llamamos a la herramienta y actualizamos el estado
-    query_result_str = query_klines_open_price.run(tool_arguments)
+    query_result_str = await query_klines_open_price.ainvoke(tool_arguments)
     
     state["query_result"] = query_result_str
-    logger.info(f"DataFetchingAgent: Resultado de la consulta: {query_result_str}")
+    logger.info("DataFetchingAgent: Resultado de la consulta: %s", query_result_str)
     return state
 
 
+async def execute_file_query_node(state: AgentState) -> AgentState:
+    """
+    Nodo de atajo para consultas puntuales: busca el precio de apertura directamente
+    en el ZIP descargado con 'query_klines_open_price_from_files', sin pasar por DuckDB.
+    """
+    logger.info("DataFetchingAgent: Consulta puntual, se busca directamente en el archivo descargado...")
+
+    tool_arguments = {
+        "file_paths": [str(p) for p in state["downloaded_files"]],
+        "timestamp": state["query_timestamp"],
+    }
+    try:
+        query_result_str = await query_klines_open_price_from_files.ainvoke(tool_arguments)
+    except ToolException as e:
+        # Mismo formato que los errores de 'query_klines_open_price' en el camino por DuckDB.
+        query_result_str = f"Error: {e}"
+
+    state["processing_status"] = "Omitido: consulta puntual resuelta sobre el archivo descargado."
+    state["query_result"] = query_result_str
+    logger.info("DataFetchingAgent: Resultado de la consulta: %s", query_result_str)
+    return state
+
+
+def route_after_fetch(state: AgentState) -> str:
+    """
+    Decide el camino tras la descarga. Si se ha descargado un único día del mismo
+    símbolo e intervalo que se consulta, leer ese ZIP es más barato que cargarlo en
+    DuckDB y volver a leerlo; en cualquier otro caso se sigue el camino completo.
+    """
+    files = state.get("downloaded_files") or []
+    single_lookup = (
+        len(files) == 1
+        and Path(files[0]).exists()
+        and state["fetch_symbol"] == state["query_symbol"]
+        and state["fetch_interval"] == state["query_interval"]
+    )
+    return "query_file" if single_lookup else "process_data"
+
+
 # --- 3. Construir el Grafo (El Plano del Agente con Flujo Multi-Paso) ---
 
 def build_agent():
     """
     Construye y compila el grafo de nuestro DataFetchingAgent.
-    Ahora incluye descarga, procesamiento y consulta.
+    Ahora incluye descarga, procesamiento y consulta. Las consultas puntuales
+    sobre un único día se resuelven directamente sobre el ZIP descargado.
+
+    Como los nodos son asíncronos, el grafo se ejecuta con `await app.ainvoke(state)`.
     """
     workflow = StateGraph(AgentState)
 
@@ -123,19 +169,51 @@ def build_agent():
     workflow.add_node("fetch_data", execute_fetch_tool_node)
     workflow.add_node("process_data", execute_processing_tool_node)
     workflow.add_node("query_data", execute_query_tool_node)
+    workflow.add_node("query_file", execute_file_query_node)
 
-    # Definimos el flujo secuencial
+    # Definimos el flujo: tras la descarga, o bien el camino completo o bien el atajo
     workflow.set_entry_point("fetch_data")
-    workflow.add_edge("fetch_data", "process_data")
+    workflow.add_conditional_edges(
+        "fetch_data",
+        route_after_fetch,
+        {"process_data": "process_data", "query_file": "query_file"},
+    )
     workflow.add_edge("process_data", "query_data")
     workflow.set_finish_point("query_data") # El grafo termina después de la consulta
+    workflow.set_finish_point("query_file")
 
     # Compilamos el grafo
     app = workflow.compile()
     return app
 
+async def run_batch(initial_states: List[Dict[str, Any]], max_concurrency: int = 8) -> List[Dict[str, Any]]:
+    """
+    Ejecuta el agente para varias combinaciones (símbolo, intervalo, fechas) a la vez.
+
+    El grafo se compila una sola vez y las ejecuciones se solapan: mientras una espera
+    a una descarga, otra puede procesar o consultar. Las escrituras en una misma base
+    de datos DuckDB se serializan dentro de la herramienta de procesamiento.
+
+    Args:
+        initial_states (List[Dict[str, Any]]): Estados iniciales, uno por ejecución.
+        max_concurrency (int): Número máximo de ejecuciones simultáneas.
+
+    Returns:
+        List[Dict[str, Any]]: Los estados finales, en el mismo orden que los iniciales.
+    """
+    app = build_agent()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _run_one(state: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            return await app.ainvoke(state)
+
+    return await asyncio.gather(*(_run_one(state) for state in initial_states))
+
 # --- 4. Bloque de Ejecución de Prueba (Solo cuando se ejecuta directamente) ---
 if __name__ == "__main__":
+    # El logging se configura solo en el punto de entrada, no al importar el módulo.
+    logging.basicConfig(level=logging.INFO) # Ajusta a DEBUG para ver más logs internos
     print("--- Ejecutando DataFetchingAgent para prueba manual (Descarga, Procesa, Consulta) ---")
     
     # Definimos los parámetros para la descarga y la consulta
@@ -161,28 +239,24 @@ if __name__ == "__main__":
 
     DB_NAME = "aipha_test_data.duckdb" # Nombre de la base de datos para este test
 
-    # Calculamos days_ago_start y days_ago_end para la herramienta fetcher
-    today = date.today()
-    fetch_days_ago_start = (today - FETCH_START_DATE).days
-    fetch_days_ago_end = (today - FETCH_END_DATE).days
-
     # El estado inicial que se pasa al agente
     initial_state = {
         "fetch_symbol": FETCH_SYMBOL,
         "fetch_interval": FETCH_INTERVAL,
-        "fetch_days_ago_start": fetch_days_ago_start,
-        "fetch_days_ago_end": fetch_days_ago_end,
+        "fetch_start_date": FETCH_START_DATE,
+        "fetch_end_date": FETCH_END_DATE,
         "query_symbol": QUERY_SYMBOL,
         "query_interval": QUERY_INTERVAL,
         "query_timestamp": QUERY_TIMESTAMP,
         "query_db_name": DB_NAME
     }
 
-    # Construimos y ejecutamos el agente
-    agent = build_agent()
-    final_state = agent.invoke(initial_state)
-    
-    print("\n--- Estado Final del DataFetchingAgent (Prueba Manual) ---")
-    print(f"Archivos Descargados: {final_state['downloaded_files']}")
-    print(f"Estado del Procesamiento: {final_state['processing_status']}")
-    print(f"Resultado de la Consulta: {final_state['query_result']}")
\ No newline at end of file
+    # Construimos y ejecutamos el agente. Se pueden añadir más estados a la lista
+    # (otros símbolos, intervalos o fechas) y se ejecutarán de forma concurrente.
+    final_states = asyncio.run(run_batch([initial_state]))
+
+    for final_state in final_states:
+        print("\n--- Estado Final del DataFetchingAgent (Prueba Manual) ---")
+        print(f"Archivos Descargados: {final_state['downloaded_files']}")
+        print(f"Estado del Procesamiento: {final_state['processing_status']}")
+        print(f"Resultado de la Consulta: {final_state['query_result']}")
\ No newline at end of file
@@ -1,16 +1,16 @@
 # aipha/agents/tools/data_processing_tool.py
 
 from langchain_core.tools import tool
-from pydantic.v1 import BaseModel, Field
+from pydantic import BaseModel, Field
 from typing import List
 import logging
 from pathlib import Path
 
 # Importamos tu procesador de datos
 from aipha.data_system.historical_data_processor import HistoricalDataProcessor
+from aipha.data_system.db_connections import exclusive_write_access, resolve_db_path
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 
 # --- 1. Definir el Esquema de Entrada de la Herramienta ---
@@ -27,30 +27,35 @@ class DataProcessorInput(BaseModel):
 @tool(args_schema=DataProcessorInput)
 def process_historical_data(file_paths: List[str], db_name: str) -> str:
     """
-    Procesa una lista de archivos ZIP de datos históricos (klines/trades),
-    los convierte en DataFrames y los almacena en una base de datos DuckDB.
+    Procesa una lista de archivos ZIP de datos históricos (klines/trades)
+    y almacena su contenido en una base de datos DuckDB.
     Devuelve un mensaje de confirmación.
     """
-    logger.info(f"Herramienta 'process_historical_data' invocada para {len(file_paths)} archivos en {db_name}.")
+    logger.info("Herramienta 'process_historical_data' invocada para %s archivos en %s.", len(file_paths), db_name)
 
     try:
         # Convertimos las rutas de string a Path
         paths_to_process = [Path(p) for p in file_paths]
         
-        # Ruta de la base de datos (dentro de un directorio 'db' en temp_test_data)
-        db_path = Path("./temp_test_data/db") / db_name
-        processor = HistoricalDataProcessor(db_path=db_path)
-        
-        processor.process_and_store_files(paths_to_process)
+        # Ruta de la base de datos (dentro de un directorio 'db' en temp_test_data, o en AIPHA_DB_DIR)
+        db_path = resolve_db_path(db_name)
+        # Liberamos las conexiones de solo lectura de la herramienta de consulta
+        # para poder abrir la base de datos en escritura, y cerramos la de escritura
+        # al terminar para que la consulta posterior pueda reabrirla.
+        # Los ZIP procesados se guardan en la caché como CSV zstd, más ligeros de releer.
+        with exclusive_write_access(db_path), HistoricalDataProcessor(db_path=db_path, zstd_cache=True) as processor:
+            processor.process_and_store_files(paths_to_process)
         
         return f"Datos procesados y almacenados exitosamente en {db_path}. Total de archivos: {len(file_paths)}"
     
     except Exception as e:
-        logger.error(f"Error ejecutando la herramienta process_historical_data: {e}")
+        logger.error("Error ejecutando la herramienta process_historical_data: %s", e)
         return f"Error al procesar y almacenar datos: {e}"
 
 # Bloque para prueba manual de la herramienta
 if __name__ == "__main__":
+    # El logging se configura solo en el punto de entrada, no al importar el módulo.
+    logging.basicConfig(level=logging.INFO)
     print("--- Probando process_historical_data directamente (requiere archivos ZIP) ---")
     # Asegúrate de tener algunos archivos ZIP en './temp_test_data/klines/...'
     # para que esta prueba manual funcione.
@@ -1,15 +1,20 @@
 # aipha/agents/tools/data_query_tool.py
 
-from langchain_core.tools import tool
-from pydantic.v1 import BaseModel, Field
+from langchain_core.tools import ToolException, tool
+from pydantic import BaseModel, Field
+from typing import Any, Iterator, List, Tuple
+import io
 import logging
-from datetime import datetime
+import zipfile
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from pathlib import Path
 import duckdb
-import pandas as pd
+import zstandard
+
+from aipha.data_system.db_connections import read_cursor, resolve_db_path
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 
 # --- 1. Definir el Esquema de Entrada de la Herramienta ---
@@ -20,6 +25,37 @@ class KlinesQueryInput(BaseModel):
     db_name: str = Field(description="Nombre del archivo de la base de datos DuckDB a consultar. Ej: 'aipha_data.duckdb'.")
 
 
+class KlineLookup(BaseModel):
+    symbol: str = Field(description="El símbolo del par de trading, por ejemplo 'BTCUSDT'.")
+    interval: str = Field(description="El intervalo de las velas (klines), por ejemplo '1d', '1h', '5m'.")
+    timestamp: str = Field(description="La marca de tiempo exacta (formato YYYY-MM-DD HH:MM:SS) de la vela.")
+
+
+class KlinesBatchQueryInput(BaseModel):
+    inputs: List[KlineLookup] = Field(description="Lista de velas (símbolo, intervalo y marca de tiempo) de las que se quiere el precio de apertura.")
+    db_name: str = Field(description="Nombre del archivo de la base de datos DuckDB a consultar. Ej: 'aipha_data.duckdb'.")
+
+
+class KlinesFileQueryInput(BaseModel):
+    file_paths: List[str] = Field(description="Rutas de los archivos ZIP de klines descargados en los que buscar la vela.")
+    timestamp: str = Field(description="La marca de tiempo exacta (formato YYYY-MM-DD HH:MM:SS) para la que se busca el precio de apertura.")
+
+
+# Consulta parametrizada: DuckDB recibe los valores por separado, sin riesgo de
+# inyección SQL y sin tener que volver a construir el texto en cada llamada.
+_OPEN_PRICE_QUERY = """
+SELECT open
+FROM klines
+WHERE symbol = ?
+  AND interval = ?
+  AND open_time = ?
+LIMIT 1;
+"""
+# Se analiza una sola vez al importar el módulo; cada ejecución solo enlaza
+# los parámetros (DuckDB copia la sentencia, así que es seguro compartirla).
+_OPEN_PRICE_STATEMENT = duckdb.extract_statements(_OPEN_PRICE_QUERY)[0]
+
+
 # --- 2. Crear la Herramienta `query_klines_open_price` ---
 @tool(args_schema=KlinesQueryInput)
 def query_klines_open_price(symbol: str, interval: str, timestamp: str, db_name: str) -> str:
@@ -28,40 +64,118 @@ def query_klines_open_price(symbol: str, interval: str, timestamp: str, db_name:
     de un kline específico (símbolo, intervalo y marca de tiempo exacta).
     Devuelve el precio de apertura como una cadena o un mensaje de "no encontrado".
     """
-    logger.info(f"Herramienta 'query_klines_open_price' invocada para {symbol}, {interval} en {timestamp} desde {db_name}.")
+    logger.info("Herramienta 'query_klines_open_price' invocada para %s, %s en %s desde %s.", symbol, interval, timestamp, db_name)
 
     try:
         # Conectamos a la base de datos
-        db_path = Path("./temp_test_data/db") / db_name
+        db_path = resolve_db_path(db_name)
         if not db_path.exists():
             return f"Error: La base de datos {db_name} no existe en {db_path}."
 
-        with duckdb.connect(database=str(db_path), read_only=True) as con:
-            # Convertimos el timestamp a un formato que DuckDB entienda
-            # Aseguramos que la columna 'open_time' se compare correctamente.
-            query = f"""
-            SELECT open
-            FROM klines
-            WHERE symbol = '{symbol}'
-              AND interval = '{interval}'
-              AND open_time = '{timestamp}'
-            LIMIT 1;
-            """
-            
-            result = con.execute(query).fetchdf()
-
-            if not result.empty:
-                open_price = result['open'].iloc[0]
+        with read_cursor(db_path) as con:
+            # DuckDB convierte el timestamp (string) al tipo de 'open_time' al hacer el bind.
+            row = con.execute(_OPEN_PRICE_STATEMENT, [symbol, interval, timestamp]).fetchone()
+
+            if row is not None:
+                open_price = row[0]
                 return f"El precio de apertura para {symbol} ({interval}) en {timestamp} es: {open_price}"
             else:
                 return f"No se encontró kline para {symbol} ({interval}) en {timestamp}."
 
     except Exception as e:
-        logger.error(f"Error ejecutando la herramienta query_klines_open_price: {e}")
+        logger.error("Error ejecutando la herramienta query_klines_open_price: %s", e)
         return f"Error al consultar el precio de apertura: {e}"
 
+# --- 3. Crear la Herramienta `query_klines_open_price_batch` ---
+@tool(args_schema=KlinesBatchQueryInput)
+def query_klines_open_price_batch(inputs: List[Any], db_name: str) -> List[Tuple]:
+    """
+    Consulta en una sola pasada los precios de apertura de varias velas
+    (símbolo, intervalo y marca de tiempo exacta).
+    Devuelve una lista de tuplas (symbol, interval, open_time, open) con las velas
+    encontradas; las que no existen simplemente no aparecen. Si la consulta no se
+    puede hacer (base de datos inexistente, error de DuckDB) lanza ToolException,
+    para no confundir un fallo con "ninguna vela encontrada".
+    """
+    logger.info("Herramienta 'query_klines_open_price_batch' invocada para %s velas desde %s.", len(inputs), db_name)
+
+    if not inputs:
+        return []
+
+    db_path = resolve_db_path(db_name)
+    if not db_path.exists():
+        raise ToolException(f"La base de datos {db_name} no existe en {db_path}.")
+
+    try:
+        # Una única consulta con una lista IN de tuplas en lugar de N consultas.
+        lookups = [item if isinstance(item, dict) else item.model_dump() for item in inputs]
+        placeholders = ", ".join(["(?, ?, ?)"] * len(lookups))
+        query = f"""
+        SELECT symbol, interval, open_time, open
+        FROM klines
+        WHERE (symbol, interval, open_time) IN ({placeholders})
+        ORDER BY symbol, interval, open_time;
+        """
+        params = [value for item in lookups for value in (item["symbol"], item["interval"], item["timestamp"])]
+
+        with read_cursor(db_path) as con:
+            return con.execute(query, params).fetchall()
+
+    except Exception as e:
+        logger.error("Error ejecutando la herramienta query_klines_open_price_batch: %s", e)
+        raise ToolException(f"Error al consultar los precios de apertura: {e}") from e
+
+# --- 4. Crear la Herramienta `query_klines_open_price_from_files` ---
+@contextmanager
+def _open_cached_csv(path: Path) -> Iterator[Any]:
+    """Abre en binario (iterable por líneas) el CSV de un archivo de la caché, sea un ZIP o un `.csv.zst`."""
+    if path.name.endswith(".csv.zst"):
+        with open(path, "rb") as f, zstandard.ZstdDecompressor().stream_reader(f) as reader:
+            yield io.BufferedReader(reader)
+    else:
+        with zipfile.ZipFile(path, "r") as z, z.open(z.infolist()[0]) as csv_file:
+            yield csv_file
+
+
+@tool(args_schema=KlinesFileQueryInput)
+def query_klines_open_price_from_files(file_paths: List[str], timestamp: str) -> str:
+    """
+    Busca el precio de apertura de una vela directamente en los archivos de klines
+    descargados, sin cargarlos antes en DuckDB. Pensada para consultas puntuales
+    sobre pocos días. Devuelve el precio de apertura o un mensaje de "no encontrado".
+    Si algún archivo no existe o no se puede leer lanza ToolException, para no
+    confundir un fallo de lectura con una vela ausente.
+    """
+    logger.info("Herramienta 'query_klines_open_price_from_files' invocada para %s en %s archivos.", timestamp, len(file_paths))
+
+    try:
+        # 'open_time' viene en milisegundos UTC, igual que al cargarlo en DuckDB.
+        target = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+        # Se compara el prefijo de cada línea en bytes: no hace falta decodificar
+        # ni separar en columnas las líneas que no son la buscada.
+        prefix = f"{int(target.timestamp() * 1000)},".encode()
+
+        for file_path in file_paths:
+            path = Path(file_path)
+            if not path.exists():
+                raise FileNotFoundError(f"El archivo {path} no existe.")
+            with _open_cached_csv(path) as csv_file:
+                for line in csv_file:
+                    if line.startswith(prefix):
+                        open_price = float(line.split(b",", 2)[1])
+                        symbol, interval = path.parts[-3], path.parts[-2]
+                        return f"El precio de apertura para {symbol} ({interval}) en {timestamp} es: {open_price}"
+
+        return f"No se encontró kline en {timestamp} en los archivos indicados."
+
+    except Exception as e:
+        logger.error("Error ejecutando la herramienta query_klines_open_price_from_files: %s", e)
+        raise ToolException(f"Error al consultar el precio de apertura: {e}") from e
+
 # Bloque para prueba manual de la herramienta
 if __name__ == "__main__":
+    # El logging se configura solo en el punto de entrada, no al importar el módulo.
+    logging.basicConfig(level=logging.INFO)
     print("--- Probando query_klines_open_price directamente ---")
     # NOTA: Para que esto funcione, primero debes haber descargado y procesado
     # datos en 'test_klines.duckdb' que incluyan la fecha y hora de la consulta.
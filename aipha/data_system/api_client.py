@@ -1,9 +1,13 @@
 # --- aipha/data_system/api_client.py (VERSIÓN 2.2 FINAL APROBADA) ---
 
+import json
 import logging
+import os
 import time
-from typing import Any, Dict, Optional, Union
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Union
 
+import httpx
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
@@ -15,6 +19,11 @@ class ApiClient:
     Un cliente API genérico y robusto. (versión 2.2)
     Puede devolver tanto datos JSON parseados como contenido binario crudo.
     Maneja el error 404 (Not Found) como un caso esperado (devuelve None) en lugar de un error.
+
+    Con `backend="httpx"` las peticiones van por un `httpx.Client` con HTTP/2: varios
+    hilos descargando del mismo host (p. ej. el CDN de Binance Vision) multiplexan sus
+    peticiones sobre una sola conexión TCP/TLS. En ese modo los reintentos solo cubren
+    fallos de conexión (httpx no reintenta por código de estado).
     """
     def __init__(
         self,
@@ -23,17 +32,37 @@ class ApiClient:
         default_timeout: int = 10,
         total_retries: int = 3,
         backoff_factor: float = 0.5,
+        pool_size: int = 32,
+        backend: str = "requests",
     ):
         self.base_url = base_url.rstrip('/')
         self.default_timeout = default_timeout
-        self.session = self._init_session(total_retries, backoff_factor)
+        self.default_headers = dict(default_headers or {})
+        self.total_retries = total_retries
+        self.pool_size = pool_size
+        self.session = self._init_session(total_retries, backoff_factor, pool_size)
 
         if default_headers:
             self.session.headers.update(default_headers)
 
-        logger.info(f"ApiClient inicializado para la URL base: {self.base_url}")
+        if backend == "httpx":
+            self._http2_client: Optional[httpx.Client] = httpx.Client(
+                headers=default_headers,
+                timeout=default_timeout,
+                transport=httpx.HTTPTransport(
+                    http2=True,
+                    retries=total_retries,
+                    limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+                ),
+            )
+        elif backend == "requests":
+            self._http2_client = None
+        else:
+            raise ValueError(f"Backend HTTP desconocido: '{backend}'")
+
+        logger.info("ApiClient inicializado para la URL base: %s", self.base_url)
 
-    def _init_session(self, total_retries: int, backoff_factor: float) -> requests.Session:
+    def _init_session(self, total_retries: int, backoff_factor: float, pool_size: int) -> requests.Session:
         session = requests.Session()
         retry_strategy = Retry(
             total=total_retries,
@@ -41,7 +70,17 @@ class ApiClient:
             status_forcelist=[429, 500, 502, 503, 504],
             allowed_methods=["HEAD", "GET", "POST", "OPTIONS"],
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        # Pool amplio para ráfagas de peticiones al mismo host (p. ej. Binance Vision):
+        # las conexiones TCP/TLS se reutilizan en lugar de repetir el handshake.
+        # requests ya envía 'Connection: keep-alive' y urllib3 activa TCP_NODELAY.
+        # `pool_size` debe ser al menos el número de hilos que comparten la sesión;
+        # por encima, urllib3 abre conexiones nuevas y las descarta tras cada uso.
+        adapter = HTTPAdapter(
+            max_retries=retry_strategy,
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            pool_block=False,
+        )
         session.mount("https://", adapter)
         session.mount("http://", adapter)
         return session
@@ -55,58 +94,316 @@ class ApiClient:
         data: Optional[Dict[str, Any]] = None,
         json_data: Optional[Dict[str, Any]] = None,
         headers: Optional[Dict[str, Any]] = None,
-    ) -> Optional[Union[Any, bytes]]:
+        stream: bool = False,
+        chunk_size: int = 64 * 1024,
+    ) -> Optional[Union[Any, bytes, Iterator[bytes]]]:
         """
         Realiza una petición HTTP a un endpoint.
+
+        Con `parse_json=False` devuelve el cuerpo en bytes sin intentar parsearlo.
+        Con `stream=True` devuelve un iterador de bloques de `chunk_size` bytes, de
+        modo que el cuerpo nunca se guarda completo en memoria; la conexión vuelve
+        al pool cuando el iterador se agota o se cierra.
         """
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
-        
-        request_headers = self.session.headers.copy()
-        if headers:
-            request_headers.update(headers)
-        
+
         start_time = time.time()
-        logger.debug(f"Petición -> {method.upper()} {url} (parse_json={parse_json})")
+        logger.debug("Petición -> %s %s (parse_json=%s)", method.upper(), url, parse_json)
 
         try:
-            response = self.session.request(
-                method=method.upper(),
-                url=url,
-                params=params,
-                data=data,
-                json=json_data,
-                headers=request_headers,
-                timeout=self.default_timeout,
-            )
+            if self._http2_client is not None:
+                response = self._http2_client.send(
+                    self._http2_client.build_request(
+                        method.upper(), url, params=params, data=data, json=json_data, headers=headers
+                    ),
+                    stream=stream,
+                )
+            else:
+                response = self.session.request(
+                    method=method.upper(),
+                    url=url,
+                    params=params,
+                    data=data,
+                    json=json_data,
+                    # requests combina por sí mismo las cabeceras de la sesión con
+                    # las de la petición; sin cabeceras extra no hay que copiar nada.
+                    headers=headers,
+                    timeout=self.default_timeout,
+                    stream=stream,
+                )
 
             if response.status_code == 404:
-                logger.warning(f"Recurso no encontrado (404) en {url}. Tratado como dato ausente.")
+                logger.warning("Recurso no encontrado (404) en %s. Tratado como dato ausente.", url)
+                response.close()
                 return None
             
             response.raise_for_status()
             
+            if stream:
+                return self._iter_chunks(response, chunk_size)
             if parse_json:
                 return response.json()
             else:
                 return response.content
 
-        except requests.exceptions.Timeout as e:
-            logger.error(f"Timeout en la petición a {url}: {e}")
+        except (requests.exceptions.Timeout, httpx.TimeoutException) as e:
+            logger.error("Timeout en la petición a %s: %s", url, e)
+            return None
+        except (requests.exceptions.ConnectionError, httpx.TransportError) as e:
+            logger.error("Error de conexión a %s: %s", url, e)
+            return None
+        except (requests.exceptions.HTTPError, httpx.HTTPStatusError) as e:
+            logger.error("Error HTTP %s para %s: %s...", e.response.status_code, url, self._error_body(e.response))
+            return None
+        except (requests.exceptions.RequestException, httpx.HTTPError) as e:
+            logger.error("Error inesperado de requests para %s: %s", url, e, exc_info=True)
+            return None
+        finally:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Petición <- finalizada en %.2f segundos.", time.time() - start_time)
+
+    @staticmethod
+    def _error_body(response: Union[requests.Response, httpx.Response]) -> str:
+        """Primeros caracteres del cuerpo de un error, para el log."""
+        try:
+            return response.text[:200]
+        except httpx.ResponseNotRead:
+            return ""  # Respuesta httpx en streaming: el cuerpo no se ha leído.
+
+    @staticmethod
+    def _body_chunks(response: Union[requests.Response, httpx.Response], chunk_size: int) -> Iterator[bytes]:
+        """Itera el cuerpo de una respuesta en streaming, sea de requests o de httpx."""
+        if isinstance(response, httpx.Response):
+            return response.iter_bytes(chunk_size=chunk_size)
+        return response.iter_content(chunk_size=chunk_size)
+
+    @classmethod
+    def _iter_chunks(cls, response: Union[requests.Response, httpx.Response], chunk_size: int) -> Iterator[bytes]:
+        """Itera el cuerpo de una respuesta en streaming y la cierra al terminar."""
+        try:
+            yield from cls._body_chunks(response, chunk_size)
+        finally:
+            response.close()
+
+    @staticmethod
+    def _preallocate(f, response: Union[requests.Response, httpx.Response]):
+        """
+        Reserva en disco el tamaño anunciado por Content-Length (solo Linux/POSIX).
+
+        Así el sistema de archivos asigna el espacio de una sola vez en lugar de ir
+        ampliando el archivo con cada bloque escrito. Si el cuerpo viene comprimido
+        (Content-Encoding) el tamaño final no es conocido y no se reserva nada.
+        """
+        content_length = response.headers.get("Content-Length")
+        if not content_length or response.headers.get("Content-Encoding") or not hasattr(os, "posix_fallocate"):
+            return
+        try:
+            os.posix_fallocate(f.fileno(), 0, int(content_length))
+        except (OSError, ValueError):
+            pass  # El sistema de archivos no lo soporta: se escribe sin reservar.
+
+    @staticmethod
+    def _validators_path(dest_path: Path) -> Path:
+        """Ruta del archivo auxiliar donde se guardan el ETag y Last-Modified de una descarga."""
+        return dest_path.with_name(dest_path.name + ".meta.json")
+
+    def _conditional_headers(self, dest_path: Path) -> Dict[str, str]:
+        """
+        Cabeceras de validación (If-None-Match / If-Modified-Since) para una copia local.
+        Si no hay copia local o no se guardaron sus validadores, no se añade ninguna.
+        """
+        meta_path = self._validators_path(dest_path)
+        if not dest_path.exists() or not meta_path.exists():
+            return {}
+        try:
+            validators = json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            return {}
+        conditional = {}
+        if validators.get("etag"):
+            conditional["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            conditional["If-Modified-Since"] = validators["last_modified"]
+        return conditional
+
+    def _save_validators(self, dest_path: Path, response: Union[requests.Response, httpx.Response]):
+        """Guarda el ETag y Last-Modified de la respuesta junto al archivo descargado."""
+        validators = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        if not any(validators.values()):
+            return
+        try:
+            self._validators_path(dest_path).write_text(json.dumps(validators))
+        except OSError as e:
+            logger.debug("No se pudieron guardar los validadores de %s: %s", dest_path, e)
+
+    def make_streaming_download(
+        self,
+        method: str,
+        endpoint: str,
+        dest_path: Path,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, Any]] = None,
+        chunk_size: int = 64 * 1024,
+    ) -> Optional[Path]:
+        """
+        Descarga el cuerpo de la respuesta directamente a disco, por bloques.
+
+        A diferencia de `make_request(parse_json=False)`, nunca mantiene el archivo
+        completo en memoria. Se escribe primero en un archivo temporal junto al
+        destino y se renombra al terminar, así una descarga interrumpida no deja
+        un archivo parcial que luego se confunda con uno válido.
+
+        Si el destino ya existe y se guardaron su ETag/Last-Modified, la petición
+        es condicional: un 304 (Not Modified) conserva la copia local sin volver
+        a transferir el cuerpo.
+
+        Returns:
+            Optional[Path]: La ruta de destino, o None si el recurso no existe (404)
+                o la petición falla.
+        """
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        dest_path = Path(dest_path)
+        tmp_path = dest_path.with_name(dest_path.name + ".part")
+
+        start_time = time.time()
+        logger.debug("Descarga -> %s %s a %s", method.upper(), url, dest_path)
+
+        request_headers = {**self._conditional_headers(dest_path), **(headers or {})}
+
+        try:
+            # Con requests la conexión se abre aquí mismo: sus errores deben caer en los except de abajo.
+            if self._http2_client is not None:
+                stream_ctx = self._http2_client.stream(method.upper(), url, params=params, headers=request_headers or None)
+            else:
+                stream_ctx = self.session.request(
+                    method=method.upper(),
+                    url=url,
+                    params=params,
+                    headers=request_headers or None,
+                    timeout=self.default_timeout,
+                    stream=True,
+                )
+
+            with stream_ctx as response:
+                if response.status_code == 304:
+                    logger.debug("Sin cambios (304) en %s. Se conserva %s.", url, dest_path)
+                    return dest_path
+                if response.status_code == 404:
+                    logger.warning("Recurso no encontrado (404) en %s. Tratado como dato ausente.", url)
+                    return None
+
+                response.raise_for_status()
+
+                dest_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(tmp_path, "wb") as f:
+                    self._preallocate(f, response)
+                    for chunk in self._body_chunks(response, chunk_size):
+                        f.write(chunk)
+                    f.truncate()
+            os.replace(tmp_path, dest_path)
+            self._save_validators(dest_path, response)
+            return dest_path
+
+        except (requests.exceptions.Timeout, httpx.TimeoutException) as e:
+            logger.error("Timeout en la petición a %s: %s", url, e)
+            return None
+        except (requests.exceptions.ConnectionError, httpx.TransportError) as e:
+            logger.error("Error de conexión a %s: %s", url, e)
+            return None
+        except (requests.exceptions.HTTPError, httpx.HTTPStatusError) as e:
+            logger.error("Error HTTP %s para %s: %s...", e.response.status_code, url, self._error_body(e.response))
+            return None
+        except (requests.exceptions.RequestException, httpx.HTTPError) as e:
+            logger.error("Error inesperado de requests para %s: %s", url, e, exc_info=True)
+            return None
+        finally:
+            tmp_path.unlink(missing_ok=True)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Descarga <- finalizada en %.2f segundos.", time.time() - start_time)
+
+    def make_async_client(self) -> httpx.AsyncClient:
+        """
+        Crea un `httpx.AsyncClient` (HTTP/2) con la misma configuración que este cliente:
+        URL base, cabeceras por defecto, timeout, reintentos de conexión y tamaño del pool.
+        Quien lo crea es responsable de cerrarlo (`async with`).
+        """
+        return httpx.AsyncClient(
+            base_url=self.base_url + "/",
+            headers=self.default_headers,
+            timeout=self.default_timeout,
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                retries=self.total_retries,
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+            ),
+        )
+
+    async def amake_streaming_download(
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        endpoint: str,
+        dest_path: Path,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, Any]] = None,
+        chunk_size: int = 64 * 1024,
+    ) -> Optional[Path]:
+        """
+        Versión asíncrona de `make_streaming_download` sobre un cliente de `make_async_client`.
+
+        Mismo contrato: escritura por bloques en un `.part` renombrado al terminar,
+        petición condicional con los validadores guardados (un 304 conserva la copia
+        local) y None si el recurso no existe o la petición falla.
+        """
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        dest_path = Path(dest_path)
+        tmp_path = dest_path.with_name(dest_path.name + ".part")
+        logger.debug("Descarga -> %s %s a %s", method.upper(), url, dest_path)
+
+        request_headers = {**self._conditional_headers(dest_path), **(headers or {})}
+
+        try:
+            async with client.stream(method.upper(), url, params=params, headers=request_headers or None) as response:
+                if response.status_code == 304:
+                    logger.debug("Sin cambios (304) en %s. Se conserva %s.", url, dest_path)
+                    return dest_path
+                if response.status_code == 404:
+                    logger.warning("Recurso no encontrado (404) en %s. Tratado como dato ausente.", url)
+                    return None
+
+                response.raise_for_status()
+
+                dest_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(tmp_path, "wb") as f:
+                    self._preallocate(f, response)
+                    async for chunk in response.aiter_bytes(chunk_size=chunk_size):
+                        f.write(chunk)
+                    f.truncate()
+            os.replace(tmp_path, dest_path)
+            self._save_validators(dest_path, response)
+            return dest_path
+
+        except httpx.TimeoutException as e:
+            logger.error("Timeout en la petición a %s: %s", url, e)
             return None
-        except requests.exceptions.ConnectionError as e:
-            logger.error(f"Error de conexión a {url}: {e}")
+        except httpx.TransportError as e:
+            logger.error("Error de conexión a %s: %s", url, e)
             return None
-        except requests.exceptions.HTTPError as e:
-            logger.error(f"Error HTTP {e.response.status_code} para {url}: {e.response.text[:200]}...")
+        except httpx.HTTPStatusError as e:
+            logger.error("Error HTTP %s para %s: %s...", e.response.status_code, url, self._error_body(e.response))
             return None
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error inesperado de requests para {url}: {e}", exc_info=True)
+        except httpx.HTTPError as e:
+            logger.error("Error inesperado de httpx para %s: %s", url, e, exc_info=True)
             return None
         finally:
-            end_time = time.time()
-            logger.debug(f"Petición <- finalizada en {end_time - start_time:.2f} segundos.")
+            tmp_path.unlink(missing_ok=True)
 
     def close_session(self):
-        """Cierra la sesión de requests para liberar recursos."""
+        """Cierra la sesión de requests (y el cliente httpx, si se usa) para liberar recursos."""
         logger.info("Cerrando la sesión del ApiClient.")
-        self.session.close()
\ No newline at end of file
+        self.session.close()
+        if self._http2_client is not None:
+            self._http2_client.close()
\ No newline at end of file
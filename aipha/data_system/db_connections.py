@@ -0,0 +1,101 @@
+"""
+Ubicación y conexiones compartidas de las bases de datos DuckDB del sistema.
+
+Las herramientas de consulta leen con conexiones de solo lectura cacheadas por
+archivo; las de ingesta piden acceso exclusivo a un archivo antes de abrirlo en
+escritura. Este módulo coordina ambas sin que ninguna herramienta dependa de otra.
+"""
+
+import atexit
+import os
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Set
+
+import duckdb
+
+
+def resolve_db_path(db_name: str) -> Path:
+    """
+    Ruta del archivo DuckDB `db_name`. El directorio es './temp_test_data/db' salvo que
+    se indique otro en la variable de entorno AIPHA_DB_DIR (p. ej. '/dev/shm/aipha' en
+    Linux, para que las bases de datos efímeras de pruebas vivan en RAM sin fsync a disco).
+    """
+    return Path(os.environ.get("AIPHA_DB_DIR", "./temp_test_data/db")) / db_name
+
+
+# Conexiones de solo lectura reutilizadas entre llamadas, una por archivo de base
+# de datos: abrir el archivo y cargar el catálogo cuesta más que la propia consulta.
+_conn_cache: Dict[Path, duckdb.DuckDBPyConnection] = {}
+# Cursores en uso y archivos en escritura, por archivo. El candado solo protege
+# estas estructuras: las consultas y las escrituras se ejecutan sin tomarlo.
+_active_readers: Counter = Counter()
+_writing: Set[Path] = set()
+_conn_state = threading.Condition(threading.Lock())
+
+
+@contextmanager
+def read_cursor(db_path: Path) -> Iterator[duckdb.DuckDBPyConnection]:
+    """
+    Proporciona un cursor sobre la conexión de solo lectura cacheada para `db_path`,
+    creándola si no existe. Si el archivo se está escribiendo, espera a que termine.
+    La consulta se ejecuta sin bloquear a otros lectores ni a otros archivos.
+    """
+    key = db_path.resolve()
+    with _conn_state:
+        _conn_state.wait_for(lambda: key not in _writing)
+        con = _conn_cache.get(key)
+        if con is None:
+            con = duckdb.connect(database=str(key), read_only=True)
+            _conn_cache[key] = con
+        cursor = con.cursor()
+        _active_readers[key] += 1
+    try:
+        yield cursor
+    finally:
+        cursor.close()
+        with _conn_state:
+            _active_readers[key] -= 1
+            _conn_state.notify_all()
+
+
+def close_cached_connections(db_path: Optional[Path] = None):
+    """
+    Cierra las conexiones cacheadas (solo la de `db_path` si se indica).
+    DuckDB no permite abrir en escritura un archivo que este proceso ya tiene
+    abierto en solo lectura; para escribir, usa `exclusive_write_access`.
+    """
+    with _conn_state:
+        keys = [db_path.resolve()] if db_path is not None else list(_conn_cache)
+        for key in keys:
+            con = _conn_cache.pop(key, None)
+            if con is not None:
+                con.close()
+
+
+@contextmanager
+def exclusive_write_access(db_path: Path) -> Iterator[None]:
+    """
+    Reserva `db_path` para escritura mientras dure el bloque: espera a que terminen las
+    consultas en curso sobre ese archivo, cierra su conexión cacheada y retiene las
+    nuevas hasta salir. Las consultas sobre otros archivos no se ven afectadas.
+    """
+    key = db_path.resolve()
+    with _conn_state:
+        _conn_state.wait_for(lambda: key not in _writing)
+        _writing.add(key)
+        _conn_state.wait_for(lambda: _active_readers[key] == 0)
+        con = _conn_cache.pop(key, None)
+        if con is not None:
+            con.close()
+    try:
+        yield
+    finally:
+        with _conn_state:
+            _writing.discard(key)
+            _conn_state.notify_all()
+
+
+atexit.register(close_cached_connections)
@@ -2,41 +2,83 @@
 Módulo para el procesamiento de datos históricos brutos y su almacenamiento.
 
 Este componente toma los archivos de datos descargados por los 'Fetchers',
-los transforma en un formato estructurado (DataFrame de pandas) y los carga
-en una base de datos persistente (DuckDB) para su posterior análisis.
+extrae los CSV que contienen y los carga con el lector CSV nativo de DuckDB
+en una base de datos persistente para su posterior análisis.
 """
 
-import io
 import logging
+import os
+import shutil
+import tempfile
+import threading
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 import duckdb
-import pandas as pd
+import zstandard
 
 logger = logging.getLogger(__name__)
 
 
 class HistoricalDataProcessor:
     """
-    Procesa archivos de datos históricos (ZIPs), los transforma en
-    DataFrames de pandas y los almacena en una base de datos DuckDB.
+    Procesa archivos de datos históricos (ZIPs, o CSV comprimidos con zstd
+    ya transcodificados) y los almacena en una base de datos DuckDB.
     """
 
-    def __init__(self, db_path: Path):
+    # Extensión de los CSV de la caché transcodificados a zstd.
+    ZSTD_SUFFIX = ".csv.zst"
+
+    def __init__(self, db_path: Path, zstd_cache: bool = False):
         """
         Inicializa el procesador.
 
         Args:
             db_path (Path): La ruta al archivo de la base de datos DuckDB.
+            zstd_cache (bool): Si es True, cada ZIP procesado se sustituye en la caché
+                por su CSV comprimido con zstd (nivel 3), que ocupa menos, se
+                descomprime más rápido y DuckDB lee directamente en reprocesos.
         """
         self.db_path = db_path
+        self.zstd_cache = zstd_cache
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Conexión persistente: se abre (y se crean las tablas) en el primer
+        # procesamiento y se reutiliza en los siguientes, sin volver a cargar el
+        # catálogo ni a adquirir el bloqueo del archivo en cada llamada.
+        self._con: Optional[duckdb.DuckDBPyConnection] = None
+        # Las conexiones de DuckDB no son seguras entre hilos.
+        self._lock = threading.Lock()
         logger.info(
-            f"HistoricalDataProcessor inicializado para la base de datos: {self.db_path}"
+            "HistoricalDataProcessor inicializado para la base de datos: %s", self.db_path
         )
 
+    def _connection(self) -> duckdb.DuckDBPyConnection:
+        """Devuelve la conexión persistente, abriéndola si aún no existe."""
+        if self._con is None:
+            con = duckdb.connect(database=str(self.db_path), read_only=False)
+            try:
+                self._create_tables(con)
+            except Exception:
+                con.close()
+                raise
+            self._con = con
+        return self._con
+
+    def close(self):
+        """Cierra la conexión con la base de datos (se reabre si se vuelve a procesar)."""
+        with self._lock:
+            if self._con is not None:
+                self._con.close()
+                self._con = None
+
+    def __enter__(self) -> "HistoricalDataProcessor":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
     def _create_tables(self, con: duckdb.DuckDBPyConnection):
         """Crea las tablas 'klines' y 'trades' si no existen."""
         con.execute(
@@ -76,112 +118,229 @@ class HistoricalDataProcessor:
         )
         logger.debug("Tablas 'klines' y 'trades' aseguradas en la base de datos.")
 
-    def _parse_klines_dataframe_from_zip(
-        self, zip_path: Path
-    ) -> Optional[pd.DataFrame]:
-        """Parsea un archivo ZIP de klines y lo convierte en un DataFrame."""
-        try:
-            parts = zip_path.parts
-            symbol, interval = parts[-3], parts[-2]
+    # Columnas de los CSV de Binance Vision (sin cabecera), con su tipo en DuckDB.
+    # Los tiempos vienen en milisegundos desde epoch y se convierten en el INSERT.
+    _KLINES_CSV_COLUMNS = {
+        "open_time": "BIGINT", "open": "DOUBLE", "high": "DOUBLE", "low": "DOUBLE",
+        "close": "DOUBLE", "volume": "DOUBLE", "close_time": "BIGINT",
+        "quote_asset_volume": "DOUBLE", "number_of_trades": "BIGINT",
+        "taker_buy_base_asset_volume": "DOUBLE", "taker_buy_quote_asset_volume": "DOUBLE",
+        "ignore": "VARCHAR",
+    }
+    _TRADES_CSV_COLUMNS = {
+        "trade_id": "BIGINT", "price": "DOUBLE", "qty": "DOUBLE", "quote_qty": "DOUBLE",
+        "trade_time": "BIGINT", "is_buyer_maker": "BOOLEAN", "is_best_match": "BOOLEAN",
+    }
 
+    def _extract_csv_from_zip(self, zip_path: Path, dest_dir: Path) -> Optional[Path]:
+        """Extrae el CSV de un archivo ZIP en `dest_dir`. Devuelve su ruta o None si el ZIP no es válido."""
+        try:
             with zipfile.ZipFile(zip_path, "r") as z:
-                csv_filename = z.namelist()[0]
-                with z.open(csv_filename) as csv_file:
-                    # Definir nombres de columna conceptuales de la fuente
-                    original_names = [
-                        "Open time", "Open", "High", "Low", "Close", "Volume",
-                        "Close time", "Quote asset volume", "Number of trades",
-                        "Taker buy base asset volume", "Taker buy quote asset volume", "Ignore",
-                    ]
-                    df = pd.read_csv(
-                        io.TextIOWrapper(csv_file, "utf-8"),
-                        header=None,
-                        names=original_names,
-                    )
-
-            # Renombrar columnas a formato snake_case de forma programática
-            df.columns = [col.lower().replace(' ', '_') for col in df.columns]
-
-            df.drop(columns=["ignore"], inplace=True)
-            df["open_time"] = pd.to_datetime(df["open_time"], unit="ms")
-            df["close_time"] = pd.to_datetime(df["close_time"], unit="ms")
-            numeric_cols = ["open", "high", "low", "close", "volume"]
-            df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors="coerce")
-
-            df["symbol"] = symbol
-            df["interval"] = interval
-            return df
+                # Los ZIP de Binance tienen un único CSV: se abre por su ZipInfo,
+                # sin volver a buscarlo por nombre en el directorio central.
+                csv_info = z.infolist()[0]
+                csv_path = dest_dir / f"{zip_path.stem}.csv"
+                with z.open(csv_info) as src, open(csv_path, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+            return csv_path
         except (zipfile.BadZipFile, IndexError, KeyError) as e:
-            logger.error(f"No se pudo procesar el archivo klines {zip_path}: {e}")
+            logger.error("No se pudo procesar el archivo %s: %s", zip_path, e)
             return None
 
-    def _parse_trades_dataframe_from_zip(
-        self, zip_path: Path
-    ) -> Optional[pd.DataFrame]:
-        """Parsea un archivo ZIP de trades y lo convierte en un DataFrame."""
+    def _transcode_zip_to_zstd(self, zip_path: Path) -> Optional[Path]:
+        """
+        Escribe junto a un ZIP de la caché su CSV comprimido con zstd. Devuelve la ruta
+        del `.csv.zst` o None si el ZIP no es válido. El ZIP no se borra aquí: lo hace
+        `_discard_transcoded_zips` una vez confirmada la inserción en la base de datos.
+        """
+        zst_path = zip_path.with_name(zip_path.stem + self.ZSTD_SUFFIX)
+        tmp_path = zst_path.with_name(zst_path.name + ".part")
         try:
-            symbol = zip_path.parts[-2]
-
             with zipfile.ZipFile(zip_path, "r") as z:
-                csv_filename = z.namelist()[0]
-                with z.open(csv_filename) as csv_file:
-                    original_names = [
-                        "Trade ID", "Price", "Qty", "Quote Qty", "Trade time",
-                        "Is buyer maker", "Is best match",
-                    ]
-                    df = pd.read_csv(
-                        io.TextIOWrapper(csv_file, "utf-8"),
-                        header=None,
-                        names=original_names,
-                    )
-
-            # Renombrar columnas a formato snake_case de forma programática
-            df.columns = [col.lower().replace(' ', '_') for col in df.columns]
-
-            df["trade_time"] = pd.to_datetime(df["trade_time"], unit="ms")
-            numeric_cols = ["price", "qty", "quote_qty"]
-            df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors="coerce")
-            df["is_buyer_maker"] = df["is_buyer_maker"].astype(bool)
-            df["is_best_match"] = df["is_best_match"].astype(bool)
-            df["symbol"] = symbol
-            return df
+                csv_info = z.infolist()[0]
+                with z.open(csv_info) as src, open(tmp_path, "wb") as dst:
+                    zstandard.ZstdCompressor(level=3).copy_stream(src, dst)
+            os.replace(tmp_path, zst_path)
         except (zipfile.BadZipFile, IndexError, KeyError) as e:
-            logger.error(f"No se pudo procesar el archivo de trades {zip_path}: {e}")
+            logger.error("No se pudo procesar el archivo %s: %s", zip_path, e)
+            return None
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        return zst_path
+
+    def _discard_transcoded_zips(self, file_paths: List[Path], prepared: List[Optional[Tuple[str, str]]]):
+        """
+        Borra los ZIP que `_prepare_file` transcodificó a `.csv.zst`, junto con su archivo
+        de validadores ('.meta.json'): describen el ZIP y no valen para su versión zstd.
+        Solo se llama tras el commit; si la inserción falla, la caché conserva los ZIP.
+        """
+        for file_path, item in zip(file_paths, prepared):
+            if item is not None and item[1].endswith(self.ZSTD_SUFFIX) and not file_path.name.endswith(self.ZSTD_SUFFIX):
+                file_path.unlink(missing_ok=True)
+                file_path.with_name(file_path.name + ".meta.json").unlink(missing_ok=True)
+
+    def _prepare_file(self, file_path: Path, dest_dir: Path) -> Optional[Tuple[str, str]]:
+        """
+        Prepara el CSV de un archivo de la caché según su tipo.
+        Devuelve ('klines'|'trades', ruta del CSV) o None si se omite.
+        """
+        if not file_path.exists():
+            logger.warning("El archivo no existe, se omite: %s", file_path)
+            return None
+
+        path_str = str(file_path.as_posix())
+        if "/klines/" in path_str:
+            kind = "klines"
+        elif "/trades/" in path_str:
+            kind = "trades"
+        else:
+            return None
+
+        if file_path.name.endswith(self.ZSTD_SUFFIX):
+            csv_path = file_path  # DuckDB lee el CSV zstd directamente.
+        elif self.zstd_cache:
+            csv_path = self._transcode_zip_to_zstd(file_path)
+        else:
+            csv_path = self._extract_csv_from_zip(file_path, dest_dir)
+        if csv_path is None:
             return None
+        return kind, str(csv_path)
 
-    def process_and_store_files(self, file_paths: List[Path]):
-        """
-        Procesa una lista de archivos ZIP, los convierte a DataFrames y los
-        almacena en la base de datos DuckDB de forma idempotente.
-        """
-        klines_dfs, trades_dfs = [], []
-        for file_path in file_paths:
-            if not file_path.exists():
-                logger.warning(f"El archivo no existe, se omite: {file_path}")
-                continue
-
-            path_str = str(file_path.as_posix())
-            if "/klines/" in path_str:
-                df = self._parse_klines_dataframe_from_zip(file_path)
-                if df is not None and not df.empty:
-                    klines_dfs.append(df)
-            elif "/trades/" in path_str:
-                df = self._parse_trades_dataframe_from_zip(file_path)
-                if df is not None and not df.empty:
-                    trades_dfs.append(df)
-
-        if not klines_dfs and not trades_dfs:
-            logger.info("No hay nuevos datos para procesar y almacenar.")
-            return
-
-        with duckdb.connect(database=str(self.db_path), read_only=False) as con:
-            self._create_tables(con)
-            if klines_dfs:
-                combined_df = pd.concat(klines_dfs, ignore_index=True)
-                logger.info(f"Insertando {len(combined_df)} registros de klines...")
-                con.execute("INSERT INTO klines BY NAME SELECT * FROM combined_df ON CONFLICT DO NOTHING;")
-            if trades_dfs:
-                combined_df = pd.concat(trades_dfs, ignore_index=True)
-                logger.info(f"Insertando {len(combined_df)} registros de trades...")
-                con.execute("INSERT INTO trades BY NAME SELECT * FROM combined_df ON CONFLICT DO NOTHING;")
-        logger.info("Procesamiento y almacenamiento de datos completado.")
\ No newline at end of file
+    def _insert_from_csvs(self, con: duckdb.DuckDBPyConnection, table: str, select_sql: str, columns: dict, csv_paths: List[str]):
+        """
+        Carga en `table` todos los CSV de `csv_paths` con una sola lectura multihilo de DuckDB.
+
+        Los archivos conservan el nombre de Binance Vision ('BTCUSDT-1d-2023-01-01...',
+        'BTCUSDT-trades-2023-01-01...'), así que el símbolo y el intervalo se obtienen del
+        nombre de cada archivo (columna `filename`) dentro de la propia consulta.
+        """
+        # El INSERT devuelve cuántas filas insertó realmente (las descartadas por
+        # ON CONFLICT no cuentan), sin recorrer la tabla completa con COUNT(*).
+        inserted = con.execute(
+            f"""
+            INSERT INTO {table} BY NAME
+            {select_sql}
+            FROM read_csv(?, header = false, columns = ?, filename = true) AS c
+            ON CONFLICT DO NOTHING;
+            """,
+            [csv_paths, columns],
+        ).fetchone()[0]
+        logger.info("Insertados %s registros de %s desde %s archivos.", inserted, table, len(csv_paths))
+
+    def _insert_klines(self, con: duckdb.DuckDBPyConnection, csv_paths: List[str]):
+        """Carga en la tabla 'klines' los CSV de klines indicados."""
+        self._insert_from_csvs(
+            con,
+            "klines",
+            """
+            SELECT
+                split_part(parse_filename(c.filename), '-', 1) AS symbol,
+                split_part(parse_filename(c.filename), '-', 2) AS interval,
+                epoch_ms(c.open_time) AS open_time,
+                c.open, c.high, c.low, c.close, c.volume,
+                epoch_ms(c.close_time) AS close_time,
+                c.quote_asset_volume, c.number_of_trades,
+                c.taker_buy_base_asset_volume, c.taker_buy_quote_asset_volume
+            """,
+            self._KLINES_CSV_COLUMNS,
+            csv_paths,
+        )
+
+    def _insert_trades(self, con: duckdb.DuckDBPyConnection, csv_paths: List[str]):
+        """Carga en la tabla 'trades' los CSV de trades indicados."""
+        self._insert_from_csvs(
+            con,
+            "trades",
+            """
+            SELECT
+                split_part(parse_filename(c.filename), '-', 1) AS symbol,
+                c.trade_id, c.price, c.qty, c.quote_qty,
+                epoch_ms(c.trade_time) AS trade_time,
+                c.is_buyer_maker, c.is_best_match
+            """,
+            self._TRADES_CSV_COLUMNS,
+            csv_paths,
+        )
+
+    def process_and_store_files(self, file_paths: List[Path], max_workers: Optional[int] = None):
+        """
+        Procesa una lista de archivos ZIP (o `.csv.zst`) y almacena su contenido
+        en la base de datos DuckDB de forma idempotente.
+
+        Los ZIP se descomprimen en paralelo a un directorio temporal (zlib libera
+        el GIL) y DuckDB lee después todos los CSV de cada tipo con su lector
+        vectorizado, sin pasar por pandas. DuckDB no lee ZIP directamente (solo
+        gzip/zstd), de ahí la extracción previa; con `zstd_cache` el ZIP se
+        transcodifica en la propia caché y DuckDB lee el `.csv.zst` resultante.
+
+        La conexión queda abierta entre llamadas; usa `close()` (o el procesador
+        como gestor de contexto) para liberar la base de datos.
+        """
+        with tempfile.TemporaryDirectory(prefix="aipha_csv_") as tmp:
+            dest_dir = Path(tmp)
+            workers = max_workers or os.cpu_count() or 1
+            with ThreadPoolExecutor(max_workers=min(workers, max(len(file_paths), 1))) as executor:
+                prepared = list(executor.map(lambda p: self._prepare_file(p, dest_dir), file_paths))
+
+            # executor.map conserva el orden de entrada.
+            klines_csvs = [csv_path for kind, csv_path in filter(None, prepared) if kind == "klines"]
+            trades_csvs = [csv_path for kind, csv_path in filter(None, prepared) if kind == "trades"]
+
+            if not klines_csvs and not trades_csvs:
+                logger.info("No hay nuevos datos para procesar y almacenar.")
+                return
+
+            with self._lock:
+                con = self._connection()
+                # Una sola transacción para todas las inserciones: un único commit
+                # (y fsync del WAL) por ejecución, y nada a medias si algo falla.
+                con.begin()
+                try:
+                    if klines_csvs:
+                        self._insert_klines(con, klines_csvs)
+                    if trades_csvs:
+                        self._insert_trades(con, trades_csvs)
+                    con.commit()
+                except Exception:
+                    # Tras un error se descarta la conexión; la siguiente llamada abre otra.
+                    try:
+                        con.rollback()
+                    finally:
+                        con.close()
+                        self._con = None
+                    raise
+            if self.zstd_cache:
+                self._discard_transcoded_zips(file_paths, prepared)
+        logger.info("Procesamiento y almacenamiento de datos completado.")
+
+    def sort_klines(self):
+        """
+        Reescribe la tabla 'klines' ordenada físicamente por (symbol, interval, open_time).
+
+        Paso de mantenimiento tras ingestas desordenadas (varios símbolos o rangos
+        cargados en distinto orden): con los datos agrupados, los zonemaps min/max
+        de cada row group permiten a DuckDB saltarse casi todos los grupos en las
+        consultas `WHERE symbol = ? AND interval = ? ORDER BY open_time`. La clave
+        primaria se recrea igual, así que las ingestas siguientes siguen siendo
+        idempotentes.
+        """
+        with self._lock:
+            con = self._connection()
+            con.begin()
+            try:
+                con.execute("CREATE TEMP TABLE klines_unsorted AS SELECT * FROM klines;")
+                con.execute("DROP TABLE klines;")
+                self._create_tables(con)
+                con.execute(
+                    "INSERT INTO klines SELECT * FROM klines_unsorted ORDER BY symbol, interval, open_time;"
+                )
+                con.execute("DROP TABLE klines_unsorted;")
+                con.commit()
+            except Exception:
+                try:
+                    con.rollback()
+                finally:
+                    con.close()
+                    self._con = None
+                raise
+        logger.info("Tabla 'klines' reordenada por (symbol, interval, open_time).")
@@ -13,7 +13,7 @@ diccionarios a la clase de plantilla correcta basándose en un campo 'template_t
 
 import abc
 from datetime import date
-from typing import Any, ClassVar, Dict, Literal, Optional, Type
+from typing import Any, ClassVar, Dict, Literal, Optional, Tuple, Type
 
 from pydantic import BaseModel, field_validator, model_validator
 
@@ -49,6 +49,33 @@ def register_template(template_type: str):
     return decorator
 
 
+def _resolve_template(
+    data: Dict[str, Any],
+) -> Tuple[Type["BaseDataRequestTemplate"], Dict[str, Any]]:
+    """
+    Obtiene la clase registrada para un diccionario serializado y sus campos.
+
+    Args:
+        data (Dict[str, Any]): El diccionario serializado con 'template_type'.
+
+    Returns:
+        Tuple: La clase de plantilla y un diccionario con el resto de campos.
+
+    Raises:
+        ValueError: Si 'template_type' no se encuentra en el diccionario o
+                    no corresponde a una plantilla registrada.
+    """
+    template_type = data.get("template_type")
+    if not template_type:
+        raise ValueError("El diccionario debe contener 'template_type' para la deserialización.")
+
+    target_class = _template_registry.get(template_type)
+    if not target_class:
+        raise ValueError(f"Tipo de plantilla desconocido: '{template_type}'")
+
+    return target_class, {k: v for k, v in data.items() if k != "template_type"}
+
+
 class BaseDataRequestTemplate(BaseModel, abc.ABC):
     """
     Clase base abstracta para todas las plantillas de solicitud de datos.
@@ -91,16 +118,35 @@ class BaseDataRequestTemplate(BaseModel, abc.ABC):
             ValueError: Si 'template_type' no se encuentra en el diccionario o
                         no corresponde a una plantilla registrada.
         """
-        data_copy = data.copy()
-        template_type = data_copy.pop("template_type", None)
-        if not template_type:
-            raise ValueError("El diccionario debe contener 'template_type' para la deserialización.")
+        target_class, fields = _resolve_template(data)
+        return target_class(**fields)
 
-        target_class = _template_registry.get(template_type)
-        if not target_class:
-            raise ValueError(f"Tipo de plantilla desconocido: '{template_type}'")
+    @classmethod
+    def from_dict_trusted(cls, data: Dict[str, Any]) -> "BaseDataRequestTemplate":
+        """
+        Deserializa un diccionario producido por `to_dict` sin volver a validarlo.
+
+        Pensado para recargar plantillas desde almacenamiento escrito por el propio
+        sistema: el contrato es que esos datos ya pasaron la validación al crearse,
+        por lo que se usa `model_construct` y solo se convierten las fechas ISO.
+        Para datos de origen externo debe usarse `from_dict`.
+
+        Args:
+            data (Dict[str, Any]): El diccionario a deserializar.
+
+        Returns:
+            BaseDataRequestTemplate: Una instancia de la subclase correspondiente.
 
-        return target_class(**data_copy)
+        Raises:
+            ValueError: Si 'template_type' no se encuentra en el diccionario o
+                        no corresponde a una plantilla registrada.
+        """
+        target_class, fields = _resolve_template(data)
+        for field_name, field in target_class.model_fields.items():
+            value = fields.get(field_name)
+            if field.annotation is date and isinstance(value, str):
+                fields[field_name] = date.fromisoformat(value)
+        return target_class.model_construct(**fields)
 
 
 @register_template("klines")
@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 import pandas as pd
 
-@dataclass
+@dataclass(slots=True)
 class AccumulationZoneFeatures:
     start_idx: int; end_idx: int; high: float; low: float; volume_avg: float
     vol_total: float; vwap: float; poc: float; mfi: float; quality_score: float
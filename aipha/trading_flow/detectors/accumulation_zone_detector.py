@@ -1,33 +1,42 @@
-import pandas as pd; import pandas_ta as ta
+import numpy as np; import pandas as pd
+from aipha.trading_flow.indicators import atr as compute_atr, rolling_mean
+from aipha.trading_flow.jit import njit
+
+@njit(cache=True, nogil=True)
+def _scan_zones(high, low, atr, vol, vol_ma, atr_mult, vol_thr, min_bars):
+    """Máquina de estados de las zonas sobre arrays float64. Devuelve el zone_id de cada vela (-1 fuera de zona)."""
+    n = high.shape[0]; zone_id = np.full(n, -1, dtype=np.int64)
+    in_zone = False; zs, zid = -1, 0; zh, zl = 0.0, 0.0
+    for i in range(n):
+        if np.isnan(atr[i]) or np.isnan(vol_ma[i]): continue
+        vol_ok = vol[i] >= vol_ma[i] * vol_thr
+        if in_zone:
+            zone_height = max(zh, high[i]) - min(zl, low[i])
+            max_h = atr[zs] * atr_mult if not np.isnan(atr[zs]) else np.inf
+            if zone_height > max_h:
+                if i - zs >= min_bars:
+                    zone_id[zs:i] = zid; zid += 1
+                in_zone = False
+        if not in_zone and vol_ok:
+            in_zone, zs, zh, zl = True, i, high[i], low[i]
+    if in_zone and n - zs >= min_bars:
+        zone_id[zs:] = zid
+    return zone_id
+
 class AccumulationZoneDetector:
     def __init__(self, **kwargs):
         self.config = {'atr_period': kwargs.get('atr_period', 14), 'atr_multiplier': kwargs.get('atr_multiplier', 1.5),
                        'min_zone_bars': kwargs.get('min_zone_bars', 5), 'volume_ma_period': kwargs.get('volume_ma_period', 20),
                        'volume_threshold': kwargs.get('volume_threshold', 1.1)}
-    def detect(self, df: pd.DataFrame) -> pd.DataFrame:
-        df_res = df.copy()
-        df_res['atr'] = ta.atr(df_res['high'], df_res['low'], df_res['close'], length=self.config['atr_period'])
-        df_res['volume_ma'] = df_res['volume'].rolling(window=self.config['volume_ma_period']).mean()
-        df_res['in_accumulation_zone'] = False; df_res['zone_id'] = pd.NA
-        in_zone = False; zone_start_idx, zone_id_counter = -1, 0; zone_high, zone_low = 0.0, 0.0
-        for i in range(len(df_res)):
-            candle = df_res.iloc[i]
-            if pd.isna(candle['atr']) or pd.isna(candle['volume_ma']): continue
-            vol_ok = candle['volume'] >= candle['volume_ma'] * self.config['volume_threshold']
-            if in_zone:
-                current_high, current_low = max(zone_high, candle['high']), min(zone_low, candle['low'])
-                zone_height = current_high - current_low
-                max_h = df_res.loc[zone_start_idx, 'atr'] * self.config['atr_multiplier'] if pd.notna(df_res.loc[zone_start_idx, 'atr']) else float('inf')
-                if zone_height > max_h:
-                    if (i - 1 - zone_start_idx + 1) >= self.config['min_zone_bars']:
-                        df_res.loc[zone_start_idx:i-1, 'in_accumulation_zone'] = True
-                        df_res.loc[zone_start_idx:i-1, 'zone_id'] = zone_id_counter; zone_id_counter += 1
-                    in_zone = False
-            if not in_zone and vol_ok:
-                in_zone, zone_start_idx, zone_high, zone_low = True, i, candle['high'], candle['low']
-        if in_zone and (len(df_res) - zone_start_idx) >= self.config['min_zone_bars']:
-            df_res.loc[zone_start_idx:len(df_res)-1, 'in_accumulation_zone'] = True
-            df_res.loc[zone_start_idx:len(df_res)-1, 'zone_id'] = zone_id_counter
-        df_res.drop(columns=['atr', 'volume_ma'], inplace=True, errors='ignore')
-        df_res['zone_id'] = df_res['zone_id'].astype("Int64")
-        return df_res
\ No newline at end of file
+    def detect(self, df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+        df_res = df if inplace else df.copy()
+        # El bucle por vela corre en un núcleo compilado sobre arrays contiguos, sin iloc/loc por fila.
+        as_f64 = lambda s: np.ascontiguousarray(s.to_numpy(dtype=np.float64, na_value=np.nan))
+        high, low = as_f64(df_res['high']), as_f64(df_res['low'])
+        atr = compute_atr(high, low, as_f64(df_res['close']), length=self.config['atr_period'])
+        volume = as_f64(df_res['volume']); volume_ma = rolling_mean(volume, self.config['volume_ma_period'])
+        zone_id = _scan_zones(high, low, atr, volume, volume_ma,
+                              float(self.config['atr_multiplier']), float(self.config['volume_threshold']), int(self.config['min_zone_bars']))
+        df_res['in_accumulation_zone'] = zone_id >= 0
+        df_res['zone_id'] = pd.arrays.IntegerArray(zone_id, zone_id < 0)
+        return df_res
@@ -1,11 +1,28 @@
 import numpy as np; import pandas as pd
+from aipha.trading_flow.indicators import rolling_quantile
+from aipha.trading_flow.jit import njit
+
+@njit(cache=True)
+def _key_candles(open_, high, low, close, vol, vt, bpt):
+    """Cuerpo, porcentaje de cuerpo y condición de vela clave en una sola pasada sobre arrays float64."""
+    n = close.shape[0]; body = np.empty(n); body_pct = np.empty(n); is_key = np.zeros(n, dtype=np.bool_)
+    for i in range(n):
+        body[i] = abs(close[i] - open_[i]); rng = high[i] - low[i]
+        body_pct[i] = body[i] / rng if rng > 0 else 0.0
+        is_key[i] = vol[i] > vt[i] and body_pct[i] < bpt
+    return body, body_pct, is_key
+
 class KeyCandleDetector:
     @staticmethod
-    def detect(df: pd.DataFrame, **kwargs) -> pd.DataFrame:
-        df_res = df.copy(); vl, vpt, bpt = kwargs.get('volume_lookback', 20), kwargs.get('volume_percentile_threshold', 0.90), kwargs.get('body_percentile_threshold', 0.30)
-        df_res["volume_threshold"] = df_res["volume"].rolling(window=vl, min_periods=vl).quantile(vpt).shift(1)
-        df_res["body_size"] = abs(df_res["close"] - df_res["open"]); cr = df_res["high"] - df_res["low"]
-        df_res["body_percentage"] = np.where(cr > 0, df_res["body_size"] / cr, 0)
-        hvc = df_res["volume"] > df_res["volume_threshold"]; ibc = df_res["body_percentage"] < bpt
-        df_res["is_key_candle"] = ((hvc & ibc).fillna(False).astype(bool))
-        return df_res
\ No newline at end of file
+    def detect(df: pd.DataFrame, inplace: bool = False, **kwargs) -> pd.DataFrame:
+        vl, vpt, bpt = kwargs.get('volume_lookback', 20), kwargs.get('volume_percentile_threshold', 0.90), kwargs.get('body_percentile_threshold', 0.30)
+        as_f64 = lambda s: np.ascontiguousarray(s.to_numpy(dtype=np.float64, na_value=np.nan))
+        vol = as_f64(df["volume"])
+        # Cuantil de la ventana anterior (equivale a rolling(vl).quantile(vpt).shift(1)).
+        vq = rolling_quantile(vol, vl, vpt); vt = np.full_like(vq, np.nan); vt[1:] = vq[:-1]
+        body, body_pct, is_key = _key_candles(as_f64(df["open"]), as_f64(df["high"]), as_f64(df["low"]),
+                                              as_f64(df["close"]), vol, vt, float(bpt))
+        new_cols = pd.DataFrame({"volume_threshold": vt, "body_size": body, "body_percentage": body_pct, "is_key_candle": is_key}, index=df.index)
+        if inplace: df[list(new_cols.columns)] = new_cols; return df
+        # Una sola concatenación en lugar de copiar df e insertar columna a columna.
+        return pd.concat([df.drop(columns=new_cols.columns, errors="ignore"), new_cols], axis=1)
@@ -1,15 +1,11 @@
-from typing import Any, Dict; import pandas as pd
+from typing import Any, Dict; import numpy as np; import pandas as pd
 class SignalCombiner:
     def __init__(self, **kwargs: Any):
         self.config = {"tolerance": kwargs.get("tolerance", 8), "min_r_squared": kwargs.get("min_r_squared", 0.45)}
-    def detect(self, df: pd.DataFrame) -> pd.DataFrame:
-        df_res = df.copy(); df_res['is_triple_coincidence'] = False
-        key_indices = df_res[df_res['is_key_candle']].index
-        for idx in key_indices:
-            start, end = max(0, idx - self.config["tolerance"]), idx
-            window = df_res.loc[start:end]
-            zone_nearby = window['in_accumulation_zone'].any()
-            candle = df_res.loc[idx]
-            trend_ok = pd.notna(candle['trend_r_squared']) and candle['trend_r_squared'] >= self.config["min_r_squared"]
-            if zone_nearby and trend_ok: df_res.loc[idx, 'is_triple_coincidence'] = True
-        return df_res
\ No newline at end of file
+    def detect(self, df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+        df_res = df if inplace else df.copy()
+        # Zona en alguna de las `tolerance` velas previas o en la actual: máximo móvil en lugar de un bucle por vela clave.
+        zone_nearby = df_res['in_accumulation_zone'].astype(np.uint8).rolling(self.config["tolerance"] + 1, min_periods=1).max().to_numpy() > 0
+        r2 = df_res['trend_r_squared'].to_numpy(dtype=np.float64, na_value=np.nan)
+        df_res['is_triple_coincidence'] = df_res['is_key_candle'].to_numpy(dtype=bool) & zone_nearby & (r2 >= self.config["min_r_squared"])
+        return df_res
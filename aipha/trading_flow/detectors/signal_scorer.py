@@ -1,15 +1,16 @@
 import pandas as pd; import numpy as np
 class SignalScorer:
     @staticmethod
-    def _normalize(v, min_v, max_v): return max(0., min(1., (v-min_v)/(max_v-min_v))) if max_v != min_v else 0.5
+    def _normalize(v, min_v, max_v): return np.clip((v-min_v)/(max_v-min_v), 0., 1.) if max_v != min_v else 0.5
     @staticmethod
-    def score(df: pd.DataFrame) -> pd.DataFrame:
-        df_res = df.copy(); df_res['final_score'] = np.nan
-        signals = df_res[df_res['is_triple_coincidence']].index
-        for idx in signals:
-            row = df_res.loc[idx]
-            zone_slice = df_res[df_res['zone_id'] == row['zone_id']]
-            zone_score = SignalScorer._normalize(len(zone_slice), 5, 50) if not zone_slice.empty else 0.
-            trend_score = row.get('trend_r_squared', 0.)
-            df_res.loc[idx, 'final_score'] = (zone_score * 0.5) + (trend_score * 0.5)
-        return df_res
\ No newline at end of file
+    def score(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+        df_res = df if inplace else df.copy(); final_score = np.full(len(df_res), np.nan)
+        signals = df_res['is_triple_coincidence'].to_numpy(dtype=bool)
+        if signals.any():
+            # Tamaño de cada zona en una sola agregación; las señales fuera de zona puntúan 0.
+            zone_size = df_res['zone_id'].map(df_res.groupby('zone_id').size()).to_numpy(dtype=np.float64, na_value=np.nan)[signals]
+            zone_score = np.where(np.isnan(zone_size), 0., SignalScorer._normalize(zone_size, 5, 50))
+            trend_score = df_res['trend_r_squared'].to_numpy(dtype=np.float64, na_value=np.nan)[signals] if 'trend_r_squared' in df_res else 0.
+            final_score[signals] = (zone_score * 0.5) + (trend_score * 0.5)
+        df_res['final_score'] = final_score
+        return df_res
@@ -1,30 +1,59 @@
-from typing import Any, List; import numpy as np; import pandas as pd; from scipy.stats import linregress
+from typing import Any; import numpy as np; import pandas as pd
+from aipha.trading_flow.jit import njit
+
+@njit(cache=True, nogil=True)
+def _zigzag_pivots(close, threshold):
+    """Pivotes ZigZag sobre un array float64. Devuelve sus posiciones ordenadas y sin repetir (incluye la primera y la última vela)."""
+    n = close.shape[0]; pivots = np.empty(n + 1, dtype=np.int64); pivots[0] = 0; k = 1
+    trend = 0; last_val, last_idx = close[0], 0  # trend: 0 sin definir, 1 alcista, -1 bajista
+    for i in range(n):
+        val = close[i]
+        if trend == 0:
+            if abs(val / last_val - 1) * 100 >= threshold: trend = 1 if val > last_val else -1
+        elif trend == 1:
+            if val < last_val:
+                trend = -1
+                if pivots[k - 1] != last_idx: pivots[k] = last_idx; k += 1
+            if val >= last_val: last_val, last_idx = val, i
+        else:
+            if val > last_val:
+                trend = 1
+                if pivots[k - 1] != last_idx: pivots[k] = last_idx; k += 1
+            if val <= last_val: last_val, last_idx = val, i
+    if pivots[k - 1] != n - 1: pivots[k] = n - 1; k += 1
+    return pivots[:k]
+
+@njit(cache=True, nogil=True)
+def _segment_regressions(close, pivots):
+    """Pendiente y R² (como scipy.stats.linregress) de close contra 0..L-1 en cada tramo [pivots[i], pivots[i+1]]."""
+    m = pivots.shape[0] - 1; slope = np.empty(m); r2 = np.empty(m)
+    for s in range(m):
+        a, b = pivots[s], pivots[s + 1]; L = b - a + 1; mx = (L - 1) / 2.0; my = 0.0
+        for j in range(a, b + 1): my += close[j]
+        my /= L; sxx = 0.0; sxy = 0.0; syy = 0.0
+        for j in range(a, b + 1):
+            dx = (j - a) - mx; dy = close[j] - my
+            sxx += dx * dx; sxy += dx * dy; syy += dy * dy
+        slope[s] = sxy / sxx
+        if syy == 0.0: r = np.nan  # Tramo plano: scipy>=1.16 devuelve rvalue NaN.
+        else:
+            r = sxy / np.sqrt(sxx * syy)
+            if r > 1.0: r = 1.0
+            elif r < -1.0: r = -1.0
+        r2[s] = r * r
+    return slope, r2
+
 class TrendDetector:
     def __init__(self, **kwargs: Any): self.config = {"zigzag_threshold": kwargs.get("zigzag_threshold", 0.5)}
-    def _detect_zigzag_pivots(self, series: pd.Series) -> List[int]:
-        pivots, trend, last_pivot_val, last_pivot_idx = [series.index[0]], None, series.iloc[0], series.index[0]
-        for idx, val in series.items():
-            if trend is None:
-                if abs(val / last_pivot_val - 1) * 100 >= self.config["zigzag_threshold"]: trend = 'up' if val > last_pivot_val else 'down'
-            elif trend == 'up':
-                if val < last_pivot_val: trend, pivots = 'down', pivots + [last_pivot_idx]
-                last_pivot_val, last_pivot_idx = max(last_pivot_val, val), idx if val >= last_pivot_val else last_pivot_idx
-            elif trend == 'down':
-                if val > last_pivot_val: trend, pivots = 'up', pivots + [last_pivot_idx]
-                last_pivot_val, last_pivot_idx = min(last_pivot_val, val), idx if val <= last_pivot_val else last_pivot_idx
-        if series.index[-1] not in pivots: pivots.append(series.index[-1])
-        return sorted(list(set(pivots)))
-    def detect(self, df: pd.DataFrame) -> pd.DataFrame:
-        df_res = df.copy()
-        if len(df_res) < 2: return df_res
-        pivot_indices = self._detect_zigzag_pivots(df_res["close"])
-        for col in ["trend_id", "trend_direction", "trend_slope", "trend_r_squared"]: df_res[col] = pd.NA if col != "trend_direction" else ""
-        for i in range(len(pivot_indices) - 1):
-            start, end = pivot_indices[i], pivot_indices[i+1]
-            if start >= end: continue
-            segment = df_res.loc[start:end]; x, y = np.arange(len(segment)), segment["close"].values
-            if len(segment) < 2: continue
-            slope, _, r_val, _, _ = linregress(x, y)
-            df_res.loc[start:end, ["trend_id", "trend_direction", "trend_slope", "trend_r_squared"]] = i, "alcista" if slope > 0 else "bajista", slope, r_val**2
-        df_res["trend_id"] = df_res["trend_id"].astype("Int64")
-        return df_res
\ No newline at end of file
+    def detect(self, df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+        if len(df) < 2: return df if inplace else df.copy()
+        close = np.ascontiguousarray(df["close"].to_numpy(dtype=np.float64, na_value=np.nan))
+        pivots = _zigzag_pivots(close, float(self.config["zigzag_threshold"]))
+        slope, r2 = _segment_regressions(close, pivots)
+        # Cada vela toma el último tramo que la contiene (el pivote compartido pertenece al tramo siguiente).
+        lengths = np.diff(pivots); lengths[-1] += 1; seg = np.repeat(np.arange(len(lengths)), lengths)
+        new_cols = pd.DataFrame({"trend_id": pd.array(seg, dtype="Int64"), "trend_direction": np.where(slope > 0, "alcista", "bajista")[seg].astype(object),
+                                 "trend_slope": slope[seg], "trend_r_squared": r2[seg]}, index=df.index)
+        if inplace: df[list(new_cols.columns)] = new_cols; return df
+        # Una sola concatenación en lugar de copiar df e insertar columna a columna.
+        return pd.concat([df.drop(columns=new_cols.columns, errors="ignore"), new_cols], axis=1)
@@ -0,0 +1,134 @@
+"""
+Indicadores técnicos compilados con Numba (si está disponible) sobre arrays float64.
+
+Reproducen la semántica de pandas_ta para que los detectores den los mismos
+resultados sin pasar por sus Series intermedias.
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+from aipha.trading_flow.jit import njit
+
+_EPS = sys.float_info.epsilon
+
+
+@njit(cache=True, nogil=True)
+def _true_range(high, low, close):
+    """True range con la convención de pandas_ta: la primera vela es NaN y se ignoran los NaN de cada término."""
+    n = high.shape[0]; tr = np.empty(n)
+    hl = high - low
+    # pandas_ta suma epsilon a todo el rango high-low si alguna vela tiene high == low.
+    if np.any(hl == 0.0): hl = hl + _EPS
+    if n > 0: tr[0] = np.nan
+    for i in range(1, n):
+        pc = close[i - 1]; m = np.nan
+        for v in (abs(hl[i]), abs(high[i] - pc), abs(pc - low[i])):
+            if not np.isnan(v) and (np.isnan(m) or v > m): m = v
+        tr[i] = m
+    return tr
+
+
+@njit(cache=True, nogil=True)
+def _rma(x, length):
+    """Media móvil de Wilder como la calcula pandas_ta: `ewm(alpha=1/length, adjust=True, min_periods=length).mean()`."""
+    n = x.shape[0]; out = np.empty(n)
+    if n == 0: return out
+    old_wt_factor = 1.0 - 1.0 / length
+    weighted = x[0]; nobs = 0 if np.isnan(weighted) else 1; old_wt = 1.0
+    out[0] = weighted if nobs >= length else np.nan
+    # Mismo algoritmo (y mismo orden de operaciones) que el ewm de pandas.
+    for i in range(1, n):
+        cur = x[i]; is_obs = not np.isnan(cur)
+        if is_obs: nobs += 1
+        if not np.isnan(weighted):
+            old_wt *= old_wt_factor
+            if is_obs:
+                if weighted != cur:
+                    weighted = (old_wt * weighted + cur) / (old_wt + 1.0)
+                old_wt += 1.0
+        elif is_obs:
+            weighted = cur
+        out[i] = weighted if nobs >= length else np.nan
+    return out
+
+
+@njit(cache=True, nogil=True)
+def _rolling_mean(x, window):
+    """Media móvil como `rolling(window).mean()` de pandas: suma deslizante con compensación de Kahan."""
+    n = x.shape[0]; out = np.empty(n)
+    nobs = 0; neg_ct = 0; total = 0.0; comp_add = 0.0; comp_rem = 0.0; same_ct = 0; prev = np.nan
+    for i in range(n):
+        if i >= window:
+            v = x[i - window]
+            if not np.isnan(v):
+                nobs -= 1; y = -v - comp_rem; t = total + y; comp_rem = t - total - y; total = t
+                if np.signbit(v): neg_ct -= 1
+        v = x[i]
+        if not np.isnan(v):
+            nobs += 1; y = v - comp_add; t = total + y; comp_add = t - total - y; total = t
+            if np.signbit(v): neg_ct += 1
+            if v == prev: same_ct += 1
+            else: same_ct = 1
+            prev = v
+        if nobs >= window and nobs > 0:
+            # Mismas correcciones que pandas para ventanas constantes y de signo único.
+            res = total / nobs
+            if same_ct >= nobs: res = prev
+            elif neg_ct == 0 and res < 0: res = 0.0
+            elif neg_ct == nobs and res > 0: res = 0.0
+            out[i] = res
+        else:
+            out[i] = np.nan
+    return out
+
+
+def _as_f64(values) -> np.ndarray:
+    if isinstance(values, pd.Series): values = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def atr(high, low, close, length: int = 14) -> np.ndarray:
+    """Average True Range (modo 'rma' de pandas_ta). Acepta Series o arrays y devuelve un array float64."""
+    length = int(length) if length and length > 0 else 14
+    return _rma(_true_range(_as_f64(high), _as_f64(low), _as_f64(close)), length)
+
+
+@njit(cache=True, nogil=True)
+def _rolling_quantile(x, window, q):
+    """Cuantil móvil (interpolación lineal) como `rolling(window, min_periods=window).quantile(q)` de pandas.
+
+    Mantiene ordenados los valores válidos de la ventana: cada vela inserta el nuevo
+    valor y retira el que sale con una búsqueda binaria y un desplazamiento.
+    """
+    n = x.shape[0]; out = np.full(n, np.nan)
+    buf = np.empty(window); nobs = 0
+    for i in range(n):
+        if i >= window:
+            old = x[i - window]
+            if not np.isnan(old):
+                j = np.searchsorted(buf[:nobs], old)
+                for k in range(j, nobs - 1): buf[k] = buf[k + 1]
+                nobs -= 1
+        v = x[i]
+        if not np.isnan(v):
+            j = np.searchsorted(buf[:nobs], v)
+            for k in range(nobs, j, -1): buf[k] = buf[k - 1]
+            buf[j] = v; nobs += 1
+        if nobs < window: continue
+        # Mismo cálculo que el skiplist de pandas para obtener resultados idénticos.
+        pos = q * (nobs - 1); lo = int(pos)
+        if lo == pos: out[i] = buf[lo]
+        else: out[i] = buf[lo] + (buf[lo + 1] - buf[lo]) * (pos - lo)
+    return out
+
+
+def rolling_mean(values, window: int) -> np.ndarray:
+    """Media móvil sobre ventanas completas (NaN si falta historial o hay NaN en la ventana)."""
+    return _rolling_mean(_as_f64(values), int(window))
+
+
+def rolling_quantile(values, window: int, q: float) -> np.ndarray:
+    """Cuantil móvil sobre ventanas completas (NaN si falta historial o hay NaN en la ventana)."""
+    return _rolling_quantile(_as_f64(values), int(window), float(q))
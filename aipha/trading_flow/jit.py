@@ -0,0 +1,25 @@
+"""
+Compilación JIT opcional de los núcleos numéricos de trading_flow.
+
+Si Numba está instalado (extra 'jit'), `njit` es su decorador y `prange` su rango
+paralelo; si no, `njit` devuelve la función sin cambios, `prange` es `range` y el
+núcleo se ejecuta en Python sobre arrays de NumPy, con los mismos resultados.
+"""
+
+try:
+    from numba import njit as _numba_njit
+    from numba import prange
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - depende del entorno
+    _numba_njit = None
+    prange = range
+    NUMBA_AVAILABLE = False
+
+
+def njit(*args, **kwargs):
+    """Equivale a `numba.njit` (con o sin argumentos) o, sin Numba, a la identidad."""
+    if NUMBA_AVAILABLE:
+        return _numba_njit(*args, **kwargs)
+    if len(args) == 1 and callable(args[0]) and not kwargs:
+        return args[0]
+    return lambda func: func
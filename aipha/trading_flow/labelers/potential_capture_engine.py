@@ -2,8 +2,39 @@
 Módulo que contiene el motor de etiquetado de eventos de trading.
 VERSIÓN FINAL CANÓNICA V7
 """
+import numpy as np
 import pandas as pd
-import pandas_ta as ta
+
+from aipha.trading_flow.indicators import atr as compute_atr
+from aipha.trading_flow.jit import njit, prange
+
+
+@njit(cache=True, parallel=True)
+def _label_paths(highs, lows, closes, atr, locs, profit_factors, sl_factor, time_limit, dd_threshold):
+    """Triple barrera sobre arrays float64 para los eventos en las posiciones `locs` (profit_factors ascendentes)."""
+    n = highs.shape[0]; out = np.zeros(locs.shape[0], dtype=np.int8)
+    for e in prange(locs.shape[0]):
+        loc = locs[e]; entry = closes[loc]; atr_val = atr[loc]
+        if np.isnan(atr_val) or atr_val == 0: continue
+        sl = entry - atr_val * sl_factor; peak = highs[loc]
+        for t in range(loc + 1, min(loc + time_limit + 1, n)):
+            hi = highs[t]; lo = lows[t]
+            # Pico acumulado desde la vela de entrada, ignorando NaN como Series.max.
+            if np.isnan(peak) or hi > peak: peak = hi
+            if lo <= sl:
+                if peak > entry: out[e] = -1 if (peak - lo) / (peak - entry) < dd_threshold else 0
+                else: out[e] = -1  # Nunca estuvo en ganancias
+                break
+            # Los niveles de TP crecen con profit_factors: búsqueda binaria del más alto alcanzado
+            # (mismo umbral entry + atr * pf que la comparación directa, sin dividir por el ATR).
+            level = 0; top = profit_factors.shape[0]
+            while level < top:
+                mid = (level + top) // 2
+                if hi >= entry + atr_val * profit_factors[mid]: level = mid + 1
+                else: top = mid
+            if level > 0:
+                out[e] = level; break
+    return out
 
 class PotentialCaptureEngine:
     def __init__(self, **kwargs):
@@ -12,47 +43,22 @@ class PotentialCaptureEngine:
                     'time_limit': kwargs.get('time_limit', 20),
                     'drawdown_threshold': kwargs.get('drawdown_threshold', 0.8),
                     'atr_period': kwargs.get('atr_period', 14)}
+        # Array ascendente construido una vez; el núcleo lo recorre de mayor a menor nivel (nivel = posición + 1).
+        self._profit_factors = np.asarray(self.cfg['profit_factors'], dtype=np.float64)
 
     def label_events(self, prices: pd.DataFrame, t_events: pd.Series) -> pd.Series:
-        df = prices.copy()
-        df['atr'] = ta.atr(df['high'], df['low'], df['close'], length=self.cfg['atr_period'])
-        valid_events = t_events.dropna().unique(); valid_events = pd.Series(valid_events)[pd.Series(valid_events).isin(df.index)]
-        labels = pd.Series(0, index=valid_events, dtype=int)
-        
-        for t0 in valid_events:
-            entry_price = df.loc[t0, 'close']; atr_val = df.loc[t0, 'atr']
-            if pd.isna(atr_val) or atr_val == 0: continue
-            
-            sl = entry_price - atr_val * self.cfg['stop_loss_factor']
-            tps = {i+1: entry_price + atr_val*pf for i, pf in enumerate(self.cfg['profit_factors'])}
-
-            end_loc = min(df.index.get_loc(t0) + self.cfg['time_limit'] + 1, len(df))
-            path = df.iloc[df.index.get_loc(t0) + 1 : end_loc]
-
-            outcome = 0
-            for t1, row in path.iterrows():
-                highest_tp_hit = 0
-                for level, tp_price in sorted(tps.items(), reverse=True):
-                    if row['high'] >= tp_price:
-                        highest_tp_hit = level
-                        break
+        # Se trabaja sobre arrays de `prices` sin copiar el DataFrame; el ATR es un array aparte.
+        as_f64 = lambda col: np.ascontiguousarray(prices[col].to_numpy(dtype=np.float64, na_value=np.nan))
+        highs, lows, closes = as_f64('high'), as_f64('low'), as_f64('close')
+        atr = compute_atr(highs, lows, closes, length=self.cfg['atr_period'])
+        # Una sola búsqueda vectorizada da las posiciones y descarta los eventos fuera del índice.
+        valid_events = t_events.dropna().unique(); locs = prices.index.get_indexer(valid_events)
+        in_index = locs >= 0; valid_events, locs = valid_events[in_index], locs[in_index]
+        if len(locs) == 0: return pd.Series(0, index=valid_events, dtype=np.int8)
 
-                if row['low'] <= sl:
-                    path_before_sl = df.loc[t0:t1]
-                    peak = path_before_sl['high'].max()
-                    
-                    if peak > entry_price:
-                        gain = peak - entry_price
-                        dd = (peak - row['low']) / gain
-                        outcome = -1 if dd < self.cfg['drawdown_threshold'] else 0
-                    else: # Nunca estuvo en ganancias
-                        outcome = -1
-                    break
-                
-                if highest_tp_hit > 0:
-                    outcome = highest_tp_hit
-                    break
-            
-            labels[t0] = outcome
-            
-        return labels
\ No newline at end of file
+        # Cada trayectoria se recorre en un núcleo compilado, en paralelo por evento y con salida temprana.
+        # Las etiquetas (-1..len(profit_factors)) caben en int8: la Series se construye una vez sobre ese buffer.
+        out = _label_paths(highs, lows, closes, atr, locs.astype(np.int64),
+                           self._profit_factors, float(self.cfg['stop_loss_factor']),
+                           int(self.cfg['time_limit']), float(self.cfg['drawdown_threshold']))
+        return pd.Series(out, index=valid_events)
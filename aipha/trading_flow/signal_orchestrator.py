@@ -1,10 +1,13 @@
-from pathlib import Path; from typing import Any, Dict; import duckdb; import pandas as pd
+from collections import OrderedDict; from concurrent.futures import ThreadPoolExecutor; from pathlib import Path; from typing import Any, Dict, List, Optional, Tuple; import pandas as pd
+from aipha.data_system.db_connections import close_cached_connections, read_cursor
 from aipha.trading_flow.detectors.accumulation_zone_detector import AccumulationZoneDetector
 from aipha.trading_flow.detectors.key_candle_detector import KeyCandleDetector
 from aipha.trading_flow.detectors.trend_detector import TrendDetector
 from aipha.trading_flow.detectors.signal_combiner import SignalCombiner
 from aipha.trading_flow.detectors.signal_scorer import SignalScorer
 class SignalOrchestrator:
+    CACHE_SIZE = 8  # Pares (symbol, interval) cargados que se conservan en memoria.
+    KLINES_COLUMNS = ("symbol", "interval", "open_time", "close_time", "open", "high", "low", "close", "volume")
     def __init__(self, db_path: Path, config: Dict[str, Any]):
         if not db_path.exists(): raise FileNotFoundError(f"DB not found: {db_path}")
         self.db_path, self.config = db_path, config
@@ -13,18 +16,77 @@ class SignalOrchestrator:
         self.trend_detector = TrendDetector(**self.config.get("trend", {}))
         self.signal_combiner = SignalCombiner(**self.config.get("signal_combiner", {}))
         self.signal_scorer = SignalScorer()
-    def _load_data(self, symbol: str, interval: str) -> pd.DataFrame:
-        with duckdb.connect(database=str(self.db_path), read_only=True) as con:
-            df = con.execute("SELECT * FROM klines WHERE symbol = ? AND interval = ? ORDER BY open_time;", [symbol, interval]).fetchdf()
-        if not df.empty:
-            df["open_time"] = pd.to_datetime(df["open_time"]); df["close_time"] = pd.to_datetime(df["close_time"])
+        self._cache: "OrderedDict[Tuple[str, str, Tuple[Optional[Tuple[int, int]], ...]], pd.DataFrame]" = OrderedDict()
+    def close(self):
+        """Cierra la conexión compartida de solo lectura con la base de datos (se reabre en la siguiente carga)."""
+        close_cached_connections(self.db_path)
+    def __enter__(self) -> "SignalOrchestrator": return self
+    def __exit__(self, *exc_info): self.close()
+    def _db_version(self) -> Tuple[Optional[Tuple[int, int]], ...]:
+        # Las escrituras pueden quedar en el WAL hasta el checkpoint: se consideran ambos archivos.
+        paths = (self.db_path, self.db_path.with_name(self.db_path.name + ".wal"))
+        return tuple((p.stat().st_mtime_ns, p.stat().st_size) if p.exists() else None for p in paths)
+    def _cache_get(self, key: Tuple[str, str, Tuple[Optional[Tuple[int, int]], ...]]) -> Optional[pd.DataFrame]:
+        # Cada acierto pasa al final del orden LRU: los pares usados a menudo son los últimos en descartarse.
+        if key not in self._cache: return None
+        self._cache.move_to_end(key); return self._cache[key]
+    def _cache_put(self, key: Tuple[str, str, Tuple[Optional[Tuple[int, int]], ...]], df: pd.DataFrame):
+        for stale in [k for k in self._cache if k[:2] == key[:2]]: del self._cache[stale]
+        self._cache[key] = df
+        if len(self._cache) > self.CACHE_SIZE: self._cache.popitem(last=False)
+    def _load_data_cached(self, symbol: str, interval: str) -> pd.DataFrame:
+        key = (symbol, interval, self._db_version())
+        df = self._cache_get(key)
+        if df is None: df = self._load_data(symbol, interval); self._cache_put(key, df)
+        # El pipeline añade columnas in situ: se entrega una copia y la versión en caché queda intacta.
+        return df.copy()
+    @staticmethod
+    def _encode_keys(df: pd.DataFrame) -> pd.DataFrame:
+        # symbol/interval son constantes por par: como categoría ocupan un código por fila en lugar de un str de Python.
+        # Es solo interno (caché y pipeline): `_decode_keys` devuelve a los llamadores el dtype object de DuckDB.
+        return df.astype({"symbol": "category", "interval": "category"})
+    @staticmethod
+    def _decode_keys(df: pd.DataFrame) -> pd.DataFrame:
+        # In situ: el DataFrame del pipeline es propio y así no se copian las demás columnas.
+        for col in ("symbol", "interval"): df[col] = df[col].astype(object)
         return df
+    def _load_data(self, symbol: str, interval: str) -> pd.DataFrame:
+        # Solo las columnas que usa el pipeline; open_time/close_time ya son TIMESTAMP y llegan como datetime64.
+        # La conexión de solo lectura es la compartida por archivo (db_connections): cede ante `exclusive_write_access`.
+        with read_cursor(self.db_path) as con:
+            df = con.execute(f"SELECT {', '.join(self.KLINES_COLUMNS)} FROM klines WHERE symbol = ? AND interval = ? ORDER BY open_time;", [symbol, interval]).fetchdf()
+        return self._encode_keys(df)
+    def _load_many(self, pairs: List[Tuple[str, str]]) -> Dict[Tuple[str, str], pd.DataFrame]:
+        # Un solo escaneo para todos los pares (unión con una lista VALUES) y un único groupby para separarlos.
+        values = ", ".join(["(?, ?)"] * len(pairs)); params = [v for pair in pairs for v in pair]
+        with read_cursor(self.db_path) as con:
+            df = con.execute(f"SELECT {', '.join(self.KLINES_COLUMNS)} FROM klines JOIN (VALUES {values}) AS req(symbol, interval) USING (symbol, interval) "
+                             "ORDER BY symbol, interval, open_time;", params).fetchdf()
+        groups = {key: self._encode_keys(g.reset_index(drop=True)) for key, g in df.groupby(["symbol", "interval"], sort=False)}
+        return {pair: groups.get(pair, self._encode_keys(df.iloc[0:0])) for pair in pairs}
+    def generate_signals_many(self, pairs: List[Tuple[str, str]]) -> Dict[Tuple[str, str], pd.DataFrame]:
+        """Como `generate_signals` para varios pares (symbol, interval), cargando los que no están en caché con una sola consulta."""
+        pairs, version = list(dict.fromkeys(pairs)), self._db_version()
+        frames = {pair: df for pair in pairs if (df := self._cache_get((*pair, version))) is not None}
+        missing = [pair for pair in pairs if pair not in frames]
+        if missing:
+            loaded = self._load_many(missing); frames.update(loaded)
+            for pair, df in loaded.items(): self._cache_put((*pair, version), df)
+        return {pair: self._run_pipeline(frames[pair].copy()) for pair in pairs}
     def generate_signals(self, symbol: str, interval: str) -> pd.DataFrame:
-        df = self._load_data(symbol, interval);
-        if df.empty: return df
-        df = self.zone_detector.detect(df)
-        df = self.trend_detector.detect(df) # Tendencia y Zona se pueden calcular en paralelo sobre df
-        df = self.key_candle_detector.detect(df, **self.config.get("key_candle", {}))
-        df = self.signal_combiner.detect(df)
-        df = self.signal_scorer.score(df)
-        return df
\ No newline at end of file
+        return self._run_pipeline(self._load_data_cached(symbol, interval))
+    def _run_pipeline(self, df: pd.DataFrame) -> pd.DataFrame:
+        if df.empty: return self._decode_keys(df)
+        # El DataFrame recién cargado es propio: cada etapa añade sus columnas sin copiarlo.
+        # Zona y Tendencia solo leen OHLCV y sus núcleos sueltan el GIL: se calculan en paralelo.
+        # La tendencia trabaja sobre una copia superficial (mismos datos, columnas propias) y se une después.
+        base_cols, df_trend = list(df.columns), df.copy(deep=False)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            zones = pool.submit(self.zone_detector.detect, df, inplace=True)
+            trends = pool.submit(self.trend_detector.detect, df_trend, inplace=True)
+            df, df_trend = zones.result(), trends.result()
+        trend_cols = [c for c in df_trend.columns if c not in base_cols]; df[trend_cols] = df_trend[trend_cols]
+        df = self.key_candle_detector.detect(df, inplace=True, **self.config.get("key_candle", {}))
+        df = self.signal_combiner.detect(df, inplace=True)
+        df = self.signal_scorer.score(df, inplace=True)
+        return self._decode_keys(df)
\ No newline at end of file
@@ -0,0 +1,124 @@
+"""
+Pruebas unitarias para la caché semántica de respuestas del LLM.
+
+Usan un modelo de embeddings falso con vectores fijos por texto, así que no
+requieren acceso a la API de Gemini.
+"""
+
+import json
+import threading
+from typing import Dict, List
+
+import pytest
+from langchain_core.embeddings import Embeddings
+from langchain_core.outputs import Generation
+
+from aipha.agents.base_agent import semantic_cache
+from aipha.agents.base_agent.semantic_cache import SemanticCache
+
+
+class FakeEmbeddings(Embeddings):
+    """Devuelve el vector registrado para cada texto y cuenta las llamadas."""
+
+    def __init__(self, vectors: Dict[str, List[float]]):
+        self.vectors = vectors
+        self.calls = 0
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        return self.vectors[text]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(t) for t in texts]
+
+
+def _llm_string(temperature: float) -> str:
+    return json.dumps({"kwargs": {"model": "fake", "temperature": temperature}}) + "---[('stop', None)]"
+
+
+DETERMINISTIC = _llm_string(0)
+VECTORS = {
+    "Explica LangGraph": [1.0, 0.0, 0.0],
+    "¿Qué es LangGraph?": [0.95, 0.05, 0.0],   # Similitud ~0.999 con la anterior.
+    "Capital de Francia": [0.0, 1.0, 0.0],       # Ortogonal.
+}
+
+
+@pytest.fixture
+def embeddings() -> FakeEmbeddings:
+    return FakeEmbeddings(VECTORS)
+
+
+def test_paraphrase_above_threshold_hits_and_unrelated_prompt_misses(embeddings):
+    """Verifica que una paráfrasis reutiliza la respuesta y un prompt distinto no."""
+    cache = SemanticCache(embeddings, similarity_threshold=0.92)
+    answer = [Generation(text="LangGraph es una librería de grafos de agentes.")]
+
+    assert cache.lookup("Explica LangGraph", DETERMINISTIC) is None
+    cache.update("Explica LangGraph", DETERMINISTIC, answer)
+
+    assert cache.lookup("¿Qué es LangGraph?", DETERMINISTIC) == answer
+    assert cache.lookup("Capital de Francia", DETERMINISTIC) is None
+    assert embeddings.calls == 3, "El update tras un fallo reutiliza el embedding del lookup."
+
+
+def test_similarity_below_threshold_misses(embeddings):
+    """Verifica que el umbral se respeta aunque los vectores sean parecidos."""
+    cache = SemanticCache(embeddings, similarity_threshold=0.9999)
+    cache.update("Explica LangGraph", DETERMINISTIC, [Generation(text="x")])
+
+    assert cache.lookup("¿Qué es LangGraph?", DETERMINISTIC) is None
+
+
+def test_only_temperature_zero_is_cached(embeddings):
+    """Verifica que las llamadas con temperatura no se guardan ni se consultan."""
+    cache = SemanticCache(embeddings)
+    sampled = _llm_string(0.7)
+    cache.update("Explica LangGraph", sampled, [Generation(text="x")])
+
+    assert cache.lookup("Explica LangGraph", sampled) is None
+    assert cache.lookup("Explica LangGraph", DETERMINISTIC) is None
+    assert embeddings.calls == 0, "Las llamadas con temperatura no deben vectorizarse."
+
+
+def test_entries_expire_after_ttl(embeddings, monkeypatch):
+    """Verifica que una entrada caducada deja de devolverse."""
+    now = [1000.0]
+    monkeypatch.setattr(semantic_cache.time, "monotonic", lambda: now[0])
+    cache = SemanticCache(embeddings, ttl_seconds=60)
+    cache.update("Explica LangGraph", DETERMINISTIC, [Generation(text="x")])
+
+    now[0] += 59
+    assert cache.lookup("Explica LangGraph", DETERMINISTIC) is not None
+    now[0] += 2
+    assert cache.lookup("Explica LangGraph", DETERMINISTIC) is None
+
+
+def test_entries_are_capped_per_llm_string(embeddings):
+    """Verifica que al superar `max_entries` se descartan las entradas más antiguas."""
+    cache = SemanticCache(embeddings, max_entries=2)
+    for prompt in VECTORS:
+        cache.update(prompt, DETERMINISTIC, [Generation(text=prompt)])
+
+    assert len(cache._entries[DETERMINISTIC]) == 2
+    assert cache.lookup("Capital de Francia", DETERMINISTIC)[0].text == "Capital de Francia"
+    assert cache.lookup("Explica LangGraph", DETERMINISTIC)[0].text == "¿Qué es LangGraph?"
+
+
+def test_concurrent_updates_and_lookups(embeddings):
+    """Verifica que lookups y updates desde varios hilos no pierden entradas ni mezclan respuestas."""
+    cache = SemanticCache(embeddings, max_entries=10_000)
+    prompts, hits = list(VECTORS), []
+
+    def work(i: int):
+        prompt = prompts[i % len(prompts)]
+        cache.update(prompt, DETERMINISTIC, [Generation(text=prompt)])
+        hits.append(cache.lookup(prompt, DETERMINISTIC))
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(30)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+    assert len(cache._entries[DETERMINISTIC]) == 30
+    assert all(hit is not None for hit in hits) and len(hits) == 30
+    assert cache.lookup("Capital de Francia", DETERMINISTIC)[0].text == "Capital de Francia"
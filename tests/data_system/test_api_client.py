@@ -0,0 +1,136 @@
+"""
+Pruebas unitarias para la clase ApiClient.
+
+Usan requests-mock para simular las respuestas HTTP, de modo que no
+requieren acceso a la red.
+"""
+
+import asyncio
+from pathlib import Path
+
+import httpx
+import pytest
+import requests
+
+from aipha.data_system.api_client import ApiClient
+
+
+@pytest.fixture
+def api_client() -> ApiClient:
+    """Proporciona un ApiClient apuntando a un host ficticio."""
+    return ApiClient(base_url="https://example.test/data")
+
+
+def test_streaming_download_writes_body_to_disk(api_client: ApiClient, requests_mock, tmp_path: Path):
+    """
+    Verifica que make_streaming_download guarda el cuerpo completo en el destino
+    y no deja archivos temporales.
+    """
+    # --- Arrange (Preparar) ---
+    payload = b"PK\x03\x04" + b"x" * 200_000
+    requests_mock.get("https://example.test/data/klines/a.zip", content=payload)
+    dest_path = tmp_path / "klines" / "a.zip"
+
+    # --- Act (Actuar) ---
+    result = api_client.make_streaming_download("GET", "klines/a.zip", dest_path=dest_path)
+
+    # --- Assert (Verificar) ---
+    assert result == dest_path
+    assert dest_path.read_bytes() == payload
+    assert list(tmp_path.rglob("*.part")) == [], "No deben quedar archivos temporales."
+
+
+def test_streaming_download_returns_none_on_404(api_client: ApiClient, requests_mock, tmp_path: Path):
+    """Verifica que un 404 se trata como dato ausente y no crea ningún archivo."""
+    requests_mock.get("https://example.test/data/klines/missing.zip", status_code=404)
+    dest_path = tmp_path / "missing.zip"
+
+    result = api_client.make_streaming_download("GET", "klines/missing.zip", dest_path=dest_path)
+
+    assert result is None
+    assert not dest_path.exists()
+
+
+@pytest.mark.parametrize("error", [requests.exceptions.ConnectTimeout, requests.exceptions.ConnectionError])
+def test_streaming_download_returns_none_on_connection_error(api_client: ApiClient, requests_mock, tmp_path: Path, error):
+    """Verifica que un fallo al abrir la conexión se registra y devuelve None en lugar de propagarse."""
+    requests_mock.get("https://example.test/data/klines/a.zip", exc=error)
+    dest_path = tmp_path / "a.zip"
+
+    result = api_client.make_streaming_download("GET", "klines/a.zip", dest_path=dest_path)
+
+    assert result is None
+    assert not dest_path.exists()
+
+
+def test_streaming_download_revalidates_with_etag(api_client: ApiClient, requests_mock, tmp_path: Path):
+    """
+    Verifica que una segunda descarga del mismo recurso envía If-None-Match y
+    que un 304 conserva la copia local sin volver a escribirla.
+    """
+    url = "https://example.test/data/klines/a.zip"
+    dest_path = tmp_path / "a.zip"
+    requests_mock.get(url, content=b"PK-original", headers={"ETag": '"abc123"'})
+    api_client.make_streaming_download("GET", "klines/a.zip", dest_path=dest_path)
+
+    requests_mock.get(url, status_code=304)
+    result = api_client.make_streaming_download("GET", "klines/a.zip", dest_path=dest_path)
+
+    assert result == dest_path
+    assert requests_mock.last_request.headers["If-None-Match"] == '"abc123"'
+    assert dest_path.read_bytes() == b"PK-original"
+
+
+def test_make_request_stream_yields_body_in_chunks(api_client: ApiClient, requests_mock):
+    """Verifica que stream=True devuelve el cuerpo por bloques sin parsearlo como JSON."""
+    payload = b"PK\x03\x04" + b"y" * 150_000
+    requests_mock.get("https://example.test/data/klines/b.zip", content=payload)
+
+    chunks = api_client.make_request("GET", "klines/b.zip", stream=True, chunk_size=64 * 1024)
+
+    received = list(chunks)
+    assert len(received) > 1, "El cuerpo debe entregarse en varios bloques."
+    assert b"".join(received) == payload
+
+
+def test_httpx_backend_streaming_download(tmp_path: Path):
+    """Verifica que el backend httpx descarga a disco y trata el 404 como dato ausente."""
+    payload = b"PK\x03\x04" + b"z" * 100_000
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("a.zip"):
+            return httpx.Response(200, content=payload, headers={"ETag": '"v1"'})
+        return httpx.Response(404)
+
+    api_client = ApiClient(base_url="https://example.test/data", backend="httpx")
+    api_client._http2_client = httpx.Client(transport=httpx.MockTransport(handler))
+
+    assert api_client.make_streaming_download("GET", "klines/a.zip", dest_path=tmp_path / "a.zip") == tmp_path / "a.zip"
+    assert (tmp_path / "a.zip").read_bytes() == payload
+    assert api_client.make_streaming_download("GET", "klines/missing.zip", dest_path=tmp_path / "missing.zip") is None
+    assert api_client.make_request("GET", "klines/a.zip", parse_json=False) == payload
+
+
+def test_make_request_merges_session_and_request_headers(requests_mock):
+    """Verifica que las cabeceras por defecto se envían junto con las de la petición."""
+    api_client = ApiClient(base_url="https://example.test/data", default_headers={"X-Client": "aipha"})
+    requests_mock.get("https://example.test/data/ping", json={"ok": True})
+
+    assert api_client.make_request("GET", "ping") == {"ok": True}
+    assert requests_mock.last_request.headers["X-Client"] == "aipha"
+
+    api_client.make_request("GET", "ping", headers={"X-Extra": "1"})
+    assert requests_mock.last_request.headers["X-Client"] == "aipha"
+    assert requests_mock.last_request.headers["X-Extra"] == "1"
+
+
+def test_async_client_uses_client_settings():
+    """Verifica que el cliente asíncrono hereda URL base, cabeceras y timeout del ApiClient."""
+    api_client = ApiClient(base_url="https://example.test/data", default_headers={"X-Client": "aipha"}, default_timeout=7)
+
+    client = api_client.make_async_client()
+
+    assert str(client.base_url) == "https://example.test/data/"
+    assert client.headers["X-Client"] == "aipha"
+    assert client.timeout.connect == 7
+    asyncio.run(client.aclose())
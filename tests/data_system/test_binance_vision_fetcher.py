@@ -5,10 +5,12 @@ Este módulo contiene tanto pruebas unitarias (usando mocks) como pruebas
 de integración (que realizan peticiones de red reales) para los fetchers.
 """
 
-from datetime import date
+import asyncio
+from datetime import date, timedelta
 from pathlib import Path
-from typing import Any, Dict, Type
+from typing import Any, Dict, List, Type
 
+import httpx
 import pytest
 
 from aipha.data_system.api_client import ApiClient
@@ -70,4 +72,59 @@ def test_fetcher_integration_handles_multiple_data_types(
     assert isinstance(file_path, Path), "El elemento devuelto debe ser un objeto Path."
     assert str(file_path).endswith(expected_path_str), "La ruta del archivo no es la esperada."
     assert file_path.exists(), f"El archivo {file_path} no fue descargado al disco."
-    assert file_path.is_file(), "La ruta debe apuntar a un archivo, no a un directorio."
\ No newline at end of file
+    assert file_path.is_file(), "La ruta debe apuntar a un archivo, no a un directorio."
+
+def test_async_fetcher_downloads_missing_days_and_revalidates_recent_ones(tmp_path: Path):
+    """
+    Verifica que la versión asíncrona descarga los días que faltan, omite los cerrados
+    ya cacheados y revalida los recientes con los validadores guardados (304), igual
+    que la versión síncrona.
+    """
+    # --- Arrange (Preparar) ---
+    today, old_day = date.today(), date(2023, 1, 1)
+    requests_seen: List[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests_seen.append(request)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=b"PK-" + request.url.path.encode(), headers={"ETag": '"v1"'})
+
+    api_client = ApiClient(base_url="https://will-be-overwritten.com")
+    fetcher = BinanceVisionFetcher(api_client=api_client, download_dir=str(tmp_path))
+    api_client.make_async_client = lambda: httpx.AsyncClient(
+        base_url=api_client.base_url + "/", transport=httpx.MockTransport(handler)
+    )
+    recent = KlinesDataRequestTemplate(name="Recent", symbol="BTCUSDT", interval="1d", start_date=today, end_date=today)
+    closed = KlinesDataRequestTemplate(name="Closed", symbol="BTCUSDT", interval="1d", start_date=old_day, end_date=old_day)
+
+    # --- Act (Actuar) ---
+    first = asyncio.run(fetcher.aensure_data_is_downloaded(recent))
+    asyncio.run(fetcher.aensure_data_is_downloaded(recent))
+    asyncio.run(fetcher.aensure_data_is_downloaded(closed))
+    asyncio.run(fetcher.aensure_data_is_downloaded(closed))
+
+    # --- Assert (Verificar) ---
+    assert first[0].read_bytes().startswith(b"PK-")
+    assert first[0].with_name(first[0].name + ".meta.json").exists(), "Deben guardarse los validadores."
+    assert [r.headers.get("If-None-Match") for r in requests_seen] == [None, '"v1"', None], \
+        "El día reciente se revalida; el cerrado solo se descarga una vez."
+
+
+def test_plan_downloads_skips_closed_cached_days(tmp_path: Path):
+    """Verifica que la enumeración compartida por ambas versiones no vuelve a pedir un día cerrado ya cacheado."""
+    api_client = ApiClient(base_url="https://will-be-overwritten.com")
+    fetcher = BinanceVisionFetcher(api_client=api_client, download_dir=str(tmp_path))
+    yesterday = date.today() - timedelta(days=1)
+    template = KlinesDataRequestTemplate(
+        name="Range", symbol="BTCUSDT", interval="1d", start_date=yesterday - timedelta(days=3), end_date=yesterday
+    )
+    cached = tmp_path / fetcher._build_endpoint(template, template.start_date)
+    cached.parent.mkdir(parents=True); cached.write_bytes(b"PK")
+
+    requested, pending = fetcher._plan_downloads(template)
+
+    assert requested[0] == cached and len(requested) == 4
+    assert [endpoint for endpoint, _ in pending] == [
+        fetcher._build_endpoint(template, template.start_date + timedelta(days=i)) for i in range(1, 4)
+    ]
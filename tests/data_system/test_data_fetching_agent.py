@@ -1,56 +1,81 @@
 # En tests/data_system/test_data_fetching_agent.py
+"""
+Pruebas del DataFetchingAgent de extremo a extremo sobre su grafo asíncrono.
 
-import pytest
-from datetime import date
+Las descargas de Binance Vision se sirven con un transporte httpx simulado, así
+que el agente recorre descarga, procesamiento y consulta reales sin acceso a la red.
+"""
+
+import asyncio
+import io
+import zipfile
+from datetime import date, datetime, timezone
 from pathlib import Path
 
-# Importamos la plantilla de datos que usaremos en el test
-from aipha.data_system.templates.templates import KlinesDataRequestTemplate
+import httpx
+import pytest
 
-# ⚠ Esta línea importará el agente. Si el archivo o la función no existen, el test fallará aquí.
-# Si ya lo creaste en algún momento, el error puede ser distinto, pero seguirá fallando.
 from aipha.agents.data_fetching_agent.agent import build_agent
+from aipha.agents.tools import fetcher_tool
+from aipha.data_system.api_client import ApiClient
+from aipha.data_system.db_connections import close_cached_connections
+from aipha.data_system.fetchers import BinanceVisionFetcher
+
+
+def _klines_zip(day: date) -> bytes:
+    """ZIP de Binance Vision con la vela diaria de `day` (open = 16000 + día del mes)."""
+    open_ms = int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp() * 1000)
+    row = f"{open_ms},{16000.0 + day.day},16700.0,16500.0,16650.0,1000,{open_ms + 86_399_999},16650000,500,500,8325000,0\n"
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr(f"BTCUSDT-1d-{day.isoformat()}.csv", row)
+    return buffer.getvalue()
 
 
 @pytest.fixture
-def sample_klines_template():
-    """Fixture que proporciona una plantilla de solicitud de klines de ejemplo."""
-    return KlinesDataRequestTemplate(
-        symbol="BTCUSDT",
-        interval="1d",
-        start_date=date(2023, 1, 1),
-        end_date=date(2023, 1, 2),
-        name="BTC Daily Data Test"
+def offline_agent(tmp_path: Path, monkeypatch):
+    """Agente compilado cuyo fetcher descarga de un Binance Vision simulado en `tmp_path`."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        day = date.fromisoformat(request.url.path.rsplit("-1d-", 1)[1].removesuffix(".zip"))
+        return httpx.Response(200, content=_klines_zip(day))
+
+    api_client = ApiClient(base_url="https://will-be-overwritten.com")
+    fetcher = BinanceVisionFetcher(api_client=api_client, download_dir=str(tmp_path / "cache"))
+    api_client.make_async_client = lambda: httpx.AsyncClient(
+        base_url=api_client.base_url + "/", transport=httpx.MockTransport(handler)
     )
+    monkeypatch.setattr(fetcher_tool, "_get_fetcher", lambda: fetcher)
+    monkeypatch.setenv("AIPHA_DB_DIR", str(tmp_path / "db"))
+    yield build_agent()
+    close_cached_connections()
+
 
-def test_data_fetching_agent_returns_local_paths(sample_klines_template):
+def _initial_state(start: date, end: date) -> dict:
+    return {
+        "fetch_symbol": "BTCUSDT", "fetch_interval": "1d", "fetch_start_date": start, "fetch_end_date": end,
+        "query_symbol": "BTCUSDT", "query_interval": "1d", "query_timestamp": "2023-01-02 00:00:00",
+        "query_db_name": "agent_test.duckdb",
+    }
+
+
+def test_data_fetching_agent_downloads_processes_and_queries(offline_agent):
     """
-    Contrato Irrefutable:
-    El DataFetchingAgent debe invocar al BinanceVisionFetcher
-    y devolver una lista de objetos Path a los archivos ZIP descargados localmente.
+    Verifica que con varios días el agente descarga un ZIP por día (rutas locales en
+    orden), los carga en DuckDB y responde la consulta desde la base de datos.
     """
-    # Construimos el agente (esta función 'build_agent' aún no existe o no es completa)
-    agent = build_agent()
-    
-    # Invocamos el agente con la plantilla de datos
-    # Esperamos que el agente procese esto y use el fetcher
-    result_state = agent.invoke({"template": sample_klines_template})
-    
-    # Verificaciones del resultado (el "Veredicto del Bulldozer")
-    # El agente debería devolver una lista de rutas de archivo
-    assert "files" in result_state, "El estado final del agente debe contener la clave 'files'."
-    assert isinstance(result_state["files"], list), "El agente debe devolver una lista de rutas."
-    assert all(isinstance(p, Path) for p in result_state["files"]), "Todos los elementos deben ser rutas locales (Path)."
-    
-    # Para el rango de 2 días (2023-01-01 y 2023-01-02), esperamos 2 archivos.
-    assert len(result_state["files"]) == 2, "Debe devolver una ruta por cada día en el rango."
-
-    # Opcional: Verificar que las rutas parezcan correctas (sin descargar aún)
-    expected_paths_part = [
-        "temp_test_data/klines/BTCUSDT/1d/BTCUSDT-1d-2023-01-01.zip",
-        "temp_test_data/klines/BTCUSDT/1d/BTCUSDT-1d-2023-01-02.zip"
-    ]
-    assert all(str(p).endswith(ep) for p, ep in zip(result_state["files"], expected_paths_part)), \
-        "Las rutas de los archivos no coinciden con el formato esperado."
-
-    print("\n--- Test para DataFetchingAgent PASADO (¡temporalmente!) ---")
\ No newline at end of file
+    final_state = asyncio.run(offline_agent.ainvoke(_initial_state(date(2023, 1, 1), date(2023, 1, 2))))
+
+    files = final_state["downloaded_files"]
+    assert all(isinstance(p, Path) for p in files)
+    assert [p.name for p in files] == ["BTCUSDT-1d-2023-01-01.zip", "BTCUSDT-1d-2023-01-02.zip"]
+    assert final_state["processing_status"].startswith("Datos procesados")
+    assert final_state["query_result"].endswith("es: 16002.0")
+
+
+def test_data_fetching_agent_single_day_reads_the_downloaded_file(offline_agent, tmp_path: Path):
+    """Verifica que una consulta sobre un único día se resuelve en el ZIP sin crear la base de datos."""
+    final_state = asyncio.run(offline_agent.ainvoke(_initial_state(date(2023, 1, 2), date(2023, 1, 2))))
+
+    assert final_state["processing_status"].startswith("Omitido")
+    assert final_state["query_result"].endswith("es: 16002.0")
+    assert not (tmp_path / "db" / "agent_test.duckdb").exists()
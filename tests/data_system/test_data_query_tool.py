@@ -0,0 +1,139 @@
+"""
+Pruebas de las herramientas de consulta de precios de apertura (data_query_tool).
+
+Usan una base de datos DuckDB mínima y ZIPs de klines creados en `tmp_path`.
+"""
+
+import zipfile
+from pathlib import Path
+
+import duckdb
+import pytest
+from langchain_core.tools import ToolException
+
+from aipha.agents.data_fetching_agent.agent import route_after_fetch
+from aipha.agents.tools.data_query_tool import query_klines_open_price_batch, query_klines_open_price_from_files
+from aipha.data_system.db_connections import close_cached_connections
+
+
+@pytest.fixture
+def klines_db(tmp_path: Path, monkeypatch) -> str:
+    """Crea 'klines.duckdb' con dos velas diarias de BTCUSDT y una de ETHUSDT."""
+    monkeypatch.setenv("AIPHA_DB_DIR", str(tmp_path))
+    with duckdb.connect(str(tmp_path / "klines.duckdb")) as con:
+        con.execute("CREATE TABLE klines (symbol VARCHAR, interval VARCHAR, open_time TIMESTAMP, open DOUBLE);")
+        con.execute(
+            "INSERT INTO klines VALUES "
+            "('BTCUSDT', '1d', '2023-01-01 00:00:00', 16001.0), "
+            "('BTCUSDT', '1d', '2023-01-02 00:00:00', 16002.0), "
+            "('ETHUSDT', '1d', '2023-01-01 00:00:00', 1201.0);"
+        )
+    yield "klines.duckdb"
+    close_cached_connections()
+
+
+def _lookup(symbol: str, timestamp: str) -> dict:
+    return {"symbol": symbol, "interval": "1d", "timestamp": timestamp}
+
+
+def _open_prices(rows) -> list:
+    return [(symbol, open_time.strftime("%Y-%m-%d"), open_price) for symbol, _, open_time, open_price in rows]
+
+
+def test_batch_returns_every_hit(klines_db):
+    """Verifica que todas las velas pedidas que existen se devuelven en una sola consulta."""
+    rows = query_klines_open_price_batch.invoke({
+        "inputs": [_lookup("BTCUSDT", "2023-01-02 00:00:00"), _lookup("ETHUSDT", "2023-01-01 00:00:00")],
+        "db_name": klines_db,
+    })
+
+    assert _open_prices(rows) == [("BTCUSDT", "2023-01-02", 16002.0), ("ETHUSDT", "2023-01-01", 1201.0)]
+
+
+def test_batch_miss_returns_empty_list(klines_db):
+    """Verifica que una vela inexistente no es un error: simplemente no aparece."""
+    rows = query_klines_open_price_batch.invoke({"inputs": [_lookup("BTCUSDT", "2023-02-01 00:00:00")], "db_name": klines_db})
+
+    assert rows == []
+
+
+def test_batch_mixed_returns_only_hits(klines_db):
+    """Verifica que en un lote con aciertos y fallos solo se devuelven los aciertos, ordenados."""
+    rows = query_klines_open_price_batch.invoke({
+        "inputs": [
+            _lookup("BTCUSDT", "2023-01-02 00:00:00"),
+            _lookup("BTCUSDT", "2023-03-01 00:00:00"),
+            _lookup("BTCUSDT", "2023-01-01 00:00:00"),
+        ],
+        "db_name": klines_db,
+    })
+
+    assert _open_prices(rows) == [("BTCUSDT", "2023-01-01", 16001.0), ("BTCUSDT", "2023-01-02", 16002.0)]
+
+
+def test_batch_errors_are_raised_not_returned_as_empty(klines_db, tmp_path: Path):
+    """Verifica que una base de datos inexistente o sin tabla 'klines' no se confunde con 'sin resultados'."""
+    lookups = [_lookup("BTCUSDT", "2023-01-01 00:00:00")]
+    with pytest.raises(ToolException, match="no existe"):
+        query_klines_open_price_batch.invoke({"inputs": lookups, "db_name": "missing.duckdb"})
+
+    duckdb.connect(str(tmp_path / "empty.duckdb")).close()
+    with pytest.raises(ToolException, match="Error al consultar"):
+        query_klines_open_price_batch.invoke({"inputs": lookups, "db_name": "empty.duckdb"})
+
+
+def _klines_zip(path: Path, rows: str) -> Path:
+    """Escribe en `path` un ZIP de Binance Vision con las filas CSV indicadas."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr(path.with_suffix(".csv").name, rows)
+    return path
+
+
+@pytest.fixture
+def klines_zip(tmp_path: Path) -> Path:
+    """ZIP con la vela diaria de BTCUSDT del 2023-01-02 (open_time 1672617600000 ms)."""
+    return _klines_zip(
+        tmp_path / "BTCUSDT" / "1d" / "BTCUSDT-1d-2023-01-02.zip",
+        "1672617600000,16002.0,16700.0,16500.0,16650.0,1000,1672703999999,16650000,500,500,8325000,0\n",
+    )
+
+
+def test_file_query_hit_and_miss(klines_zip):
+    """Verifica que la vela se encuentra en el ZIP y que otra marca de tiempo da 'no encontrado'."""
+    hit = query_klines_open_price_from_files.invoke({"file_paths": [str(klines_zip)], "timestamp": "2023-01-02 00:00:00"})
+    miss = query_klines_open_price_from_files.invoke({"file_paths": [str(klines_zip)], "timestamp": "2023-01-03 00:00:00"})
+
+    assert hit == "El precio de apertura para BTCUSDT (1d) en 2023-01-02 00:00:00 es: 16002.0"
+    assert miss.startswith("No se encontró kline")
+
+
+def test_file_query_errors_are_raised(klines_zip, tmp_path: Path):
+    """Verifica que un archivo inexistente o corrupto lanza ToolException en vez de parecer una vela ausente."""
+    missing = str(tmp_path / "BTCUSDT" / "1d" / "BTCUSDT-1d-2023-01-05.zip")
+    with pytest.raises(ToolException, match="no existe"):
+        query_klines_open_price_from_files.invoke({"file_paths": [str(klines_zip), missing], "timestamp": "2023-01-03 00:00:00"})
+
+    corrupt = tmp_path / "corrupt.zip"
+    corrupt.write_bytes(b"no es un zip")
+    with pytest.raises(ToolException, match="Error al consultar"):
+        query_klines_open_price_from_files.invoke({"file_paths": [str(corrupt)], "timestamp": "2023-01-02 00:00:00"})
+
+
+def _routing_state(files, query_symbol: str = "BTCUSDT", query_interval: str = "1d") -> dict:
+    return {
+        "downloaded_files": files, "fetch_symbol": "BTCUSDT", "fetch_interval": "1d",
+        "query_symbol": query_symbol, "query_interval": query_interval,
+    }
+
+
+def test_route_after_fetch_uses_the_file_only_for_a_single_matching_download(klines_zip, tmp_path: Path):
+    """Verifica que el atajo por archivo solo se toma con un único ZIP existente del mismo símbolo e intervalo."""
+    other_day = _klines_zip(tmp_path / "BTCUSDT" / "1d" / "BTCUSDT-1d-2023-01-03.zip", "")
+
+    assert route_after_fetch(_routing_state([klines_zip])) == "query_file"
+    assert route_after_fetch(_routing_state([klines_zip, other_day])) == "process_data"
+    assert route_after_fetch(_routing_state([tmp_path / "missing.zip"])) == "process_data"
+    assert route_after_fetch(_routing_state([klines_zip], query_symbol="ETHUSDT")) == "process_data"
+    assert route_after_fetch(_routing_state([klines_zip], query_interval="1h")) == "process_data"
+    assert route_after_fetch(_routing_state([])) == "process_data"
@@ -0,0 +1,77 @@
+"""
+Pruebas unitarias para las conexiones DuckDB compartidas (db_connections).
+
+Verifican que las lecturas no se serializan entre sí y que una escritura solo
+retiene las consultas sobre su propio archivo.
+"""
+
+import threading
+from pathlib import Path
+
+import duckdb
+import pytest
+
+from aipha.data_system.db_connections import (
+    close_cached_connections,
+    exclusive_write_access,
+    read_cursor,
+)
+
+
+@pytest.fixture
+def db_paths(tmp_path: Path):
+    """Crea dos bases de datos con una tabla mínima y cierra las conexiones cacheadas al terminar."""
+    paths = []
+    for name in ("a.duckdb", "b.duckdb"):
+        path = tmp_path / name
+        with duckdb.connect(str(path)) as con:
+            con.execute("CREATE TABLE t AS SELECT 1 AS x;")
+        paths.append(path)
+    yield paths
+    close_cached_connections()
+
+
+def test_readers_run_concurrently(db_paths):
+    """Verifica que dos cursores del mismo archivo pueden estar abiertos a la vez desde hilos distintos."""
+    path = db_paths[0]
+    both_open = threading.Barrier(2, timeout=5)
+    results = []
+
+    def read():
+        with read_cursor(path) as con:
+            both_open.wait()  # Fallaría por timeout si el segundo lector esperase al primero.
+            results.append(con.execute("SELECT x FROM t").fetchone()[0])
+
+    threads = [threading.Thread(target=read) for _ in range(2)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+    assert results == [1, 1]
+
+
+def test_write_waits_for_readers_and_only_blocks_its_file(db_paths):
+    """
+    Verifica que la escritura espera a la consulta en curso de su archivo, que durante
+    la escritura se puede leer otro archivo y que después se vuelve a leer el primero.
+    """
+    path_a, path_b = db_paths
+    writer_done = threading.Event()
+
+    def write():
+        with exclusive_write_access(path_a):
+            with duckdb.connect(str(path_a)) as con:
+                con.execute("UPDATE t SET x = 2;")
+            with read_cursor(path_b) as con:  # Otro archivo: no queda retenido.
+                assert con.execute("SELECT x FROM t").fetchone()[0] == 1
+        writer_done.set()
+
+    with read_cursor(path_a) as con:
+        writer = threading.Thread(target=write)
+        writer.start()
+        assert not writer_done.wait(0.2), "La escritura no debe empezar con una consulta en curso."
+        assert con.execute("SELECT x FROM t").fetchone()[0] == 1
+    writer.join(timeout=5)
+
+    assert writer_done.is_set()
+    with read_cursor(path_a) as con:
+        assert con.execute("SELECT x FROM t").fetchone()[0] == 2
@@ -60,6 +60,7 @@ def test_process_and_store_klines(mock_klines_zip_path: Path, tmp_path: Path):
 
     # --- Act (Actuar) ---
     processor.process_and_store_files(file_paths)
+    processor.close()
 
     # --- Assert (Verificar) ---
     # Conectarse a la base de datos para verificar los resultados
@@ -90,4 +91,143 @@ def test_process_and_store_klines(mock_klines_zip_path: Path, tmp_path: Path):
         "number_of_trades": "int64",
     }
     for col, expected_type in expected_types.items():
-        assert str(result_df[col].dtype) == expected_type, f"La columna '{col}' tiene un tipo incorrecto."
\ No newline at end of file
+        assert str(result_df[col].dtype) == expected_type, f"La columna '{col}' tiene un tipo incorrecto."
+
+def test_process_and_store_trades_is_idempotent(tmp_path: Path):
+    """
+    Verifica que los trades se cargan con sus tipos correctos y que volver a
+    procesar el mismo archivo no duplica registros.
+    """
+    # --- Arrange (Preparar) ---
+    trades_dir = tmp_path / "trades" / "BTCUSDT"
+    trades_dir.mkdir(parents=True, exist_ok=True)
+    zip_path = trades_dir / "BTCUSDT-trades-2023-01-01.zip"
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.writestr(
+            "BTCUSDT-trades-2023-01-01.csv",
+            "1,16500.5,0.1,1650.05,1672531200123,True,True\n"
+            "2,16501.0,0.2,3300.2,1672531200456,False,True\n",
+        )
+    db_path = tmp_path / "test_data.db"
+    processor = HistoricalDataProcessor(db_path=db_path)
+
+    # --- Act (Actuar) ---
+    processor.process_and_store_files([zip_path])
+    processor.process_and_store_files([zip_path])
+    processor.close()
+
+    # --- Assert (Verificar) ---
+    con = duckdb.connect(database=str(db_path), read_only=True)
+    result_df = con.execute("SELECT * FROM trades ORDER BY trade_id").fetchdf()
+    con.close()
+
+    assert len(result_df) == 2, "Reprocesar el mismo archivo no debe duplicar registros."
+    assert result_df["symbol"].tolist() == ["BTCUSDT", "BTCUSDT"]
+    assert result_df["is_buyer_maker"].tolist() == [True, False]
+    assert result_df["trade_time"].iloc[0] == pd.Timestamp("2023-01-01 00:00:00.123")
+
+
+def test_zstd_cache_replaces_zip_and_can_be_reprocessed(mock_klines_zip_path: Path, tmp_path: Path):
+    """
+    Verifica que con zstd_cache el ZIP se sustituye por su CSV zstd y que ese
+    archivo puede volver a procesarse directamente.
+    """
+    # --- Arrange (Preparar) ---
+    processor = HistoricalDataProcessor(db_path=tmp_path / "test_data.db", zstd_cache=True)
+    meta_path = mock_klines_zip_path.with_name(mock_klines_zip_path.name + ".meta.json")
+    meta_path.write_text('{"etag": "\\"abc\\""}')
+
+    # --- Act (Actuar) ---
+    with processor:
+        processor.process_and_store_files([mock_klines_zip_path])
+    zst_path = mock_klines_zip_path.with_name("BTCUSDT-1d-2023-01-02.csv.zst")
+
+    with HistoricalDataProcessor(db_path=tmp_path / "reprocessed.db") as reprocessor:
+        reprocessor.process_and_store_files([zst_path])
+
+    # --- Assert (Verificar) ---
+    assert not mock_klines_zip_path.exists(), "El ZIP debe sustituirse por su versión zstd."
+    assert not meta_path.exists(), "Los validadores del ZIP no valen para su versión zstd."
+    assert zst_path.exists()
+    con = duckdb.connect(database=str(tmp_path / "reprocessed.db"), read_only=True)
+    count_result = con.execute("SELECT COUNT(*) FROM klines WHERE symbol = 'BTCUSDT' AND interval = '1d'").fetchone()
+    con.close()
+    assert count_result[0] == 2
+
+
+def test_zstd_cache_keeps_zip_when_insert_fails(mock_klines_zip_path: Path, tmp_path: Path, monkeypatch):
+    """
+    Verifica que si la inserción falla el ZIP y sus validadores siguen en la caché:
+    solo se borran después de que la transacción se confirme.
+    """
+    # --- Arrange (Preparar) ---
+    processor = HistoricalDataProcessor(db_path=tmp_path / "test_data.db", zstd_cache=True)
+    meta_path = mock_klines_zip_path.with_name(mock_klines_zip_path.name + ".meta.json")
+    meta_path.write_text("{}")
+
+    def failing_insert(con, csv_paths):
+        raise duckdb.IOException("disco lleno")
+
+    monkeypatch.setattr(processor, "_insert_klines", failing_insert)
+
+    # --- Act (Actuar) ---
+    with processor, pytest.raises(duckdb.IOException):
+        processor.process_and_store_files([mock_klines_zip_path])
+
+    # --- Assert (Verificar) ---
+    assert mock_klines_zip_path.exists()
+    assert meta_path.exists()
+
+
+def test_connection_is_reused_until_closed(mock_klines_zip_path: Path, tmp_path: Path):
+    """
+    Verifica que el procesador reutiliza su conexión entre llamadas y que, tras
+    cerrarla, vuelve a abrir una nueva al procesar otra vez.
+    """
+    # --- Arrange (Preparar) ---
+    processor = HistoricalDataProcessor(db_path=tmp_path / "test_data.db")
+
+    # --- Act (Actuar) ---
+    processor.process_and_store_files([mock_klines_zip_path])
+    first_con = processor._con
+    processor.process_and_store_files([mock_klines_zip_path])
+    second_con = processor._con
+    processor.close()
+    closed_con = processor._con
+    processor.process_and_store_files([mock_klines_zip_path])
+
+    # --- Assert (Verificar) ---
+    assert first_con is not None and first_con is second_con
+    assert closed_con is None
+    assert processor._con.execute("SELECT COUNT(*) FROM klines").fetchone()[0] == 2
+    processor.close()
+
+
+def test_sort_klines_clusters_rows_and_keeps_primary_key(tmp_path: Path):
+    """
+    Verifica que `sort_klines` deja las filas ordenadas por (symbol, interval,
+    open_time) sin perder datos y que la clave primaria sigue descartando duplicados.
+    """
+    # --- Arrange (Preparar) ---
+    processor = HistoricalDataProcessor(db_path=tmp_path / "test_data.db")
+    con = processor._connection()
+    con.execute(
+        """
+        INSERT INTO klines (symbol, interval, open_time, open, high, low, close, volume, close_time)
+        VALUES ('ETHUSDT', '1d', '2023-01-02', 1, 1, 1, 1, 1, '2023-01-02 23:59:59'),
+               ('BTCUSDT', '1d', '2023-01-02', 1, 1, 1, 1, 1, '2023-01-02 23:59:59'),
+               ('BTCUSDT', '1d', '2023-01-01', 1, 1, 1, 1, 1, '2023-01-01 23:59:59');
+        """
+    )
+
+    # --- Act (Actuar) ---
+    processor.sort_klines()
+    rows = processor._con.execute("SELECT symbol, open_time FROM klines").fetchall()
+    processor._con.execute(
+        "INSERT INTO klines (symbol, interval, open_time) VALUES ('BTCUSDT', '1d', '2023-01-01') ON CONFLICT DO NOTHING;"
+    )
+
+    # --- Assert (Verificar) ---
+    assert [(symbol, ts.day) for symbol, ts in rows] == [("BTCUSDT", 1), ("BTCUSDT", 2), ("ETHUSDT", 2)]
+    assert processor._con.execute("SELECT COUNT(*) FROM klines").fetchone()[0] == 3
+    processor.close()
@@ -48,4 +48,28 @@ def test_klines_template_serialization_deserialization_roundtrip():
 
     # 5. Assert (Verificación de la Deserialización):
     assert isinstance(reconstructed_template, KlinesDataRequestTemplate)
-    assert original_template == reconstructed_template 
\ No newline at end of file
+    assert original_template == reconstructed_template 
+
+def test_klines_template_trusted_deserialization_matches_validated():
+    """
+    Valida que `from_dict_trusted` reconstruye desde `to_dict` el mismo objeto
+    que la deserialización validada, con las fechas convertidas a `date`.
+    """
+    # 1. Arrange: Serializar una plantilla ya validada.
+    original_template = KlinesDataRequestTemplate(
+        name="BTC-USDT 1d Klines Enero 2023",
+        symbol="btcusdt",
+        interval="1d",
+        start_date=date(2023, 1, 1),
+        end_date=date(2023, 1, 31),
+    )
+    serialized_dict = original_template.to_dict()
+
+    # 2. Act: Reconstruir el objeto sin validación.
+    reconstructed_template = BaseDataRequestTemplate.from_dict_trusted(serialized_dict)
+
+    # 3. Assert: Mismo tipo, mismos valores y fechas como `date`.
+    assert isinstance(reconstructed_template, KlinesDataRequestTemplate)
+    assert reconstructed_template.start_date == date(2023, 1, 1)
+    assert reconstructed_template == BaseDataRequestTemplate.from_dict(serialized_dict)
+    assert reconstructed_template.to_dict() == serialized_dict
@@ -0,0 +1,15 @@
+"""
+Fixtures compartidas por las pruebas de trading_flow.
+"""
+import pytest
+
+
+@pytest.fixture(params=["jit", "py"])
+def both_impls(request):
+    """
+    Ejecuta la prueba con cada implementación de un núcleo: `both_impls(kernel)` devuelve
+    el núcleo compilado (si Numba está instalado) o su versión en Python puro (`py_func`).
+    """
+    if request.param == "jit":
+        return lambda kernel: kernel
+    return lambda kernel: getattr(kernel, "py_func", kernel)
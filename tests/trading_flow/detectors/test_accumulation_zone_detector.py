@@ -0,0 +1,32 @@
+"""
+Pruebas unitarias para el núcleo de detección de zonas de acumulación.
+"""
+import numpy as np
+
+from aipha.trading_flow.detectors.accumulation_zone_detector import _scan_zones
+
+
+def test_scan_zones_closes_zone_on_breakout_and_at_end(both_impls):
+    """
+    Verifica que una zona se cierra cuando el rango supera ATR * multiplicador,
+    que solo se conserva si alcanza min_bars y que la última zona abierta se
+    cierra al final de la serie.
+    """
+    # --- Arrange (Preparar) ---
+    kernel = both_impls(_scan_zones)
+    n = 12
+    high = np.full(n, 101.0); low = np.full(n, 100.0)
+    high[6] = 105.0  # Ruptura: el rango (5.0) supera 1.0 * 2.0
+    vol = np.zeros(n); vol[0] = vol[7] = 2.0  # Solo estas velas abren zona
+    atr = np.ones(n); atr[:1] = np.nan  # La primera vela no tiene ATR
+    vol_ma = np.ones(n)
+
+    # --- Act (Actuar) ---
+    zone_id = kernel(high, low, atr, vol, vol_ma, 2.0, 1.5, 4)
+
+    # --- Assert (Verificar) ---
+    # La vela 0 no cuenta (ATR NaN); la zona empieza en la 7 y dura 5 velas.
+    assert zone_id.tolist() == [-1] * 7 + [0] * 5
+    vol[1] = 2.0
+    zone_id = kernel(high, low, atr, vol, vol_ma, 2.0, 1.5, 4)
+    assert zone_id.tolist() == [-1] + [0] * 5 + [-1] + [1] * 5
@@ -0,0 +1,48 @@
+"""
+Pruebas unitarias para el detector de velas clave y su núcleo compilado.
+"""
+import numpy as np
+import pandas as pd
+
+from aipha.trading_flow.detectors.key_candle_detector import KeyCandleDetector, _key_candles
+
+
+def test_key_candles_requires_high_volume_and_small_body(both_impls):
+    """
+    Verifica que una vela es clave solo si su volumen supera el umbral y su
+    cuerpo es pequeño respecto al rango, y que un rango nulo da porcentaje 0.
+    """
+    # --- Arrange (Preparar) ---
+    kernel = both_impls(_key_candles)
+    open_ = np.array([100.0, 100.0, 100.0, 100.0, 100.0])
+    close = np.array([100.5, 104.0, 100.5, 100.0, 100.5])
+    high = np.array([105.0, 105.0, 105.0, 100.0, 105.0])
+    low = np.array([95.0, 95.0, 95.0, 100.0, 95.0])
+    vol = np.array([50.0, 50.0, 10.0, 50.0, 50.0])
+    vt = np.array([20.0, 20.0, 20.0, 20.0, np.nan])  # Sin umbral no hay vela clave
+
+    # --- Act (Actuar) ---
+    body, body_pct, is_key = kernel(open_, high, low, close, vol, vt, 0.3)
+
+    # --- Assert (Verificar) ---
+    np.testing.assert_allclose(body, [0.5, 4.0, 0.5, 0.0, 0.5])
+    np.testing.assert_allclose(body_pct, [0.05, 0.4, 0.05, 0.0, 0.05])
+    assert is_key.tolist() == [True, False, False, True, False]
+
+
+def test_detect_inplace_reuses_input_frame():
+    """
+    Verifica que `inplace=True` añade las columnas al DataFrame recibido y que,
+    por defecto, la entrada no se modifica.
+    """
+    # --- Arrange (Preparar) ---
+    df = pd.DataFrame({"open": [1.0, 2.0], "high": [2.0, 3.0], "low": [0.5, 1.5], "close": [1.5, 2.5], "volume": [10.0, 20.0]})
+
+    # --- Act (Actuar) ---
+    copied = KeyCandleDetector.detect(df, volume_lookback=1)
+    shared = KeyCandleDetector.detect(df, inplace=True, volume_lookback=1)
+
+    # --- Assert (Verificar) ---
+    assert copied is not df and shared is df
+    assert "is_key_candle" in df.columns
+    pd.testing.assert_frame_equal(copied, shared)
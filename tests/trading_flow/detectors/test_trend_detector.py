@@ -0,0 +1,46 @@
+"""
+Pruebas unitarias para el núcleo de pivotes ZigZag del detector de tendencias.
+"""
+import numpy as np
+import pytest
+from scipy.stats import linregress
+
+from aipha.trading_flow.detectors.trend_detector import _segment_regressions, _zigzag_pivots
+
+
+def test_zigzag_pivots_marks_extremes_and_series_ends(both_impls):
+    """
+    Verifica que se marcan como pivotes el máximo y el mínimo de cada tramo,
+    además de la primera y la última vela, sin posiciones repetidas.
+    """
+    # --- Arrange (Preparar) ---
+    kernel = both_impls(_zigzag_pivots)
+    close = np.array([100.0, 101.0, 103.0, 102.0, 99.0, 98.0, 100.0, 104.0, 104.0])
+
+    # --- Act (Actuar) ---
+    pivots = kernel(close, 0.5)
+
+    # --- Assert (Verificar) ---
+    # Máximo en la vela 2, mínimo en la 5 y fin de serie en la 8.
+    assert pivots.tolist() == [0, 2, 5, 8]
+
+
+def test_segment_regressions_match_linregress(both_impls):
+    """
+    Verifica que la pendiente y el R² de cada tramo coinciden con
+    `scipy.stats.linregress` sobre las velas del tramo (pivotes incluidos).
+    """
+    # --- Arrange (Preparar) ---
+    kernel = both_impls(_segment_regressions)
+    rng = np.random.default_rng(5)
+    close = 30000 + np.cumsum(rng.normal(0, 20, 120))
+    pivots = np.array([0, 17, 18, 64, 119])
+
+    # --- Act (Actuar) ---
+    slope, r2 = kernel(close, pivots)
+
+    # --- Assert (Verificar) ---
+    for i, (a, b) in enumerate(zip(pivots[:-1], pivots[1:])):
+        expected = linregress(np.arange(b - a + 1), close[a:b + 1])
+        assert slope[i] == pytest.approx(expected.slope, rel=1e-9)
+        assert r2[i] == pytest.approx(expected.rvalue ** 2, rel=1e-9)
@@ -1,13 +1,14 @@
 """
 Pruebas unitarias para la clase PotentialCaptureEngine.
 """
+import numpy as np
 import pandas as pd
 import pytest
-from aipha.trading_flow.labelers.potential_capture_engine import PotentialCaptureEngine
+from aipha.trading_flow.labelers.potential_capture_engine import PotentialCaptureEngine, _label_paths
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def base_price_data() -> pd.DataFrame:
-    """Crea un DataFrame de precios base para las pruebas."""
+    """Crea un DataFrame de precios base para las pruebas (compartido: cada prueba trabaja sobre una copia)."""
     dates = pd.date_range(start="2023-01-01", periods=100, freq="D")
     data = {"open": 100.0, "high": 105.0, "low": 95.0, "close": 100.0}
     df = pd.DataFrame(data, index=dates)
@@ -57,14 +58,29 @@ def test_triple_barrier_scenarios(
     event_time = prices.index[10]
     t_events = pd.Series([event_time])
 
-    # Modificar el DataFrame para simular el escenario de prueba.
-    for idx_loc, col_vals in modifications.items():
-        for col, val in col_vals.items():
-            # Usar iloc para una asignación más robusta en pruebas
-            prices.iloc[idx_loc, prices.columns.get_loc(col)] = val
+    # Modificar el DataFrame para simular el escenario de prueba: una asignación
+    # posicional por columna con todas sus filas modificadas.
+    for col in {c for col_vals in modifications.values() for c in col_vals}:
+        rows = [idx_loc for idx_loc, col_vals in modifications.items() if col in col_vals]
+        prices.iloc[rows, prices.columns.get_loc(col)] = [modifications[idx_loc][col] for idx_loc in rows]
     
     labels = engine.label_events(prices, t_events)
     
     assert not labels.empty
     actual_label = labels.iloc[0] # Usar iloc[0] porque el índice puede variar
-    assert actual_label == expected_label, f"Fallo en el escenario: '{scenario_name}'"
\ No newline at end of file
+    assert actual_label == expected_label, f"Fallo en el escenario: '{scenario_name}'"
+
+def test_label_paths_kernel(both_impls):
+    """Valida el TP más alto, la prioridad del SL en la misma vela, el ATR inválido y el SL sin ganancias."""
+    kernel = both_impls(_label_paths)
+    highs = np.array([100.0, 111.0, 100.0, 106.0, 100.0, 100.0, 100.0, 100.0])
+    lows = np.array([100.0, 99.0, 100.0, 94.0, 100.0, 100.0, 99.0, 90.0])
+    closes = np.full(8, 100.0)
+    atr = np.array([5.0, 5.0, 5.0, 5.0, np.nan, 5.0, 5.0, 5.0])  # TP1=105, TP2=110, SL=95
+    locs = np.array([0, 2, 4, 5], dtype=np.int64)
+
+    labels = kernel(highs, lows, closes, atr, locs, np.array([1.0, 2.0]), 1.0, 2, 0.8)
+
+    # 2: la vela 1 supera el TP 2. 0: la vela 3 toca TP 1 y SL, manda el SL y el drawdown
+    # lo neutraliza. 0: ATR NaN. -1: la vela 7 toca el SL sin haber estado en ganancias.
+    assert labels.dtype == np.int8 and labels.tolist() == [2, 0, 0, -1]
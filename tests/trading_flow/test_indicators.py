@@ -0,0 +1,67 @@
+"""
+Pruebas unitarias para los indicadores técnicos compilados.
+"""
+import numpy as np
+import pandas as pd
+
+from aipha.trading_flow.indicators import atr, rolling_mean, rolling_quantile
+
+
+def test_atr_matches_pandas_ta_rma_definition():
+    """
+    Verifica que el ATR coincide con la definición de pandas_ta (true range con
+    la primera vela a NaN y `ewm(alpha=1/n, min_periods=n)`).
+    """
+    # --- Arrange (Preparar) ---
+    rng = np.random.default_rng(7)
+    close = pd.Series(100 + np.cumsum(rng.normal(0, 1, 200)))
+    high = close + rng.random(200) * 2
+    low = close - rng.random(200) * 2
+    prev_close = close.shift(1)
+    tr = pd.concat([high - low, high - prev_close, prev_close - low], axis=1).abs().max(axis=1)
+    tr.iloc[:1] = np.nan
+    expected = tr.ewm(alpha=1 / 14, min_periods=14).mean().to_numpy()
+
+    # --- Act (Actuar) ---
+    result = atr(high, low, close, length=14)
+
+    # --- Assert (Verificar) ---
+    assert np.isnan(result[:14]).all(), "Las primeras 14 velas no tienen historial suficiente."
+    np.testing.assert_allclose(result[14:], expected[14:], rtol=1e-12)
+
+
+def test_rolling_quantile_matches_pandas_rolling_quantile():
+    """
+    Verifica que el cuantil móvil coincide con `rolling(w, min_periods=w).quantile(q)`,
+    incluidos valores repetidos y ventanas con NaN.
+    """
+    # --- Arrange (Preparar) ---
+    rng = np.random.default_rng(11)
+    volume = rng.integers(0, 50, 300).astype(float)
+    volume[[40, 41, 200]] = np.nan
+    expected = pd.Series(volume).rolling(window=20, min_periods=20).quantile(0.9).to_numpy()
+
+    # --- Act (Actuar) ---
+    result = rolling_quantile(volume, 20, 0.9)
+
+    # --- Assert (Verificar) ---
+    np.testing.assert_array_equal(result, expected)
+
+
+def test_rolling_mean_matches_pandas_rolling_mean():
+    """
+    Verifica que la media móvil coincide exactamente con `rolling(w).mean()`,
+    incluidas ventanas con NaN y tramos de valores constantes.
+    """
+    # --- Arrange (Preparar) ---
+    rng = np.random.default_rng(13)
+    volume = rng.random(300) * 1000
+    volume[100:130] = 250.0
+    volume[[40, 200]] = np.nan
+    expected = pd.Series(volume).rolling(window=20).mean().to_numpy()
+
+    # --- Act (Actuar) ---
+    result = rolling_mean(volume, 20)
+
+    # --- Assert (Verificar) ---
+    np.testing.assert_array_equal(result, expected)
@@ -4,6 +4,7 @@ import duckdb
 import pandas as pd
 import numpy as np
 import pytest
+from aipha.data_system.db_connections import exclusive_write_access
 from aipha.data_system.historical_data_processor import HistoricalDataProcessor
 from aipha.trading_flow.signal_orchestrator import SignalOrchestrator
 
@@ -13,7 +14,7 @@ def populated_db_path(tmp_path: Path) -> Path:
     
     # 1. GENERACIÓN 100% DETERMINISTA
     num_rows = 50
-    timestamps = pd.to_datetime(pd.date_range(start="2023-01-01", periods=num_rows, freq="h"))
+    timestamps = np.datetime64("2023-01-01T00:00", "us") + np.arange(num_rows) * np.timedelta64(1, "h")
     base_df = pd.DataFrame(index=pd.RangeIndex(start=0, stop=num_rows, step=1))
     
     # Valores base
@@ -26,15 +27,13 @@ def populated_db_path(tmp_path: Path) -> Path:
     
     # -- TENDENCIA (Índices 20-38) -- PERFECTAMENTE LINEAL
     trend_start, trend_end = 20, 38
-    for i in range(trend_start, trend_end + 1):
-        price = 10050.0 + (i - trend_start) * 2.0
-        base_df.loc[i, ['open', 'high', 'low', 'close']] = price, price + 2.0, price - 2.0, price
+    price = 10050.0 + np.arange(trend_end - trend_start + 1) * 2.0
+    base_df.loc[trend_start:trend_end, ['open', 'high', 'low', 'close']] = np.column_stack([price, price + 2.0, price - 2.0, price])
         
     # -- ZONA (Índices 30-38) -- DENTRO DE LA TENDENCIA
     zone_start, zone_end = 30, 38
-    base_df.loc[zone_start:zone_end, 'high'] = base_df.loc[zone_start, 'high'] + 1.0
-    base_df.loc[zone_start:zone_end, 'low'] = base_df.loc[zone_start, 'low'] - 1.0
-    base_df.loc[zone_start:zone_end, 'volume'] = 150.0
+    zone_price = price[zone_start - trend_start]  # Rango de la vela inicial ampliado en 1.0 por cada lado.
+    base_df.loc[zone_start:zone_end, ['high', 'low', 'volume']] = [zone_price + 3.0, zone_price - 3.0, 150.0]
     
     # -- VELA CLAVE (Índice 39) --
     key_idx = 39
@@ -42,15 +41,15 @@ def populated_db_path(tmp_path: Path) -> Path:
     
     golden_df = base_df
     golden_df["symbol"] = "GOLD-BTC"; golden_df["interval"] = "1h"
-    golden_df["close_time"] = golden_df["open_time"] + pd.Timedelta(minutes=59)
+    golden_df["close_time"] = timestamps + np.timedelta64(59, "m")
     for col in ['quote_asset_volume', 'number_of_trades', 'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume']:
         golden_df[col] = 0.0
     
     proc = HistoricalDataProcessor(db_path=db_path)
     with duckdb.connect(database=str(db_path)) as con:
         proc._create_tables(con);
-        con.register('df_temp', golden_df)
-        con.execute("INSERT INTO klines BY NAME SELECT * FROM df_temp")
+        # insert_into es posicional: se reordenan las columnas como en la tabla.
+        con.from_df(golden_df[con.table('klines').columns]).insert_into('klines')
     return db_path
 
 def test_orchestrator_full_pipeline_detects_triple_coincidence(populated_db_path: Path):
@@ -68,4 +67,45 @@ def test_orchestrator_full_pipeline_detects_triple_coincidence(populated_db_path
     key_candle_idx = 39
     
     assert result_df.loc[key_candle_idx, 'is_triple_coincidence'] == True, "La Triple Coincidencia final falló"
-    
\ No newline at end of file
+    
+def test_orchestrator_reuses_loaded_klines_until_db_changes(populated_db_path: Path):
+    """Verifica que una segunda llamada no vuelve a consultar DuckDB y que un cambio en la base invalida la caché."""
+    orchestrator = SignalOrchestrator(db_path=populated_db_path, config={})
+    calls = []
+    load = orchestrator._load_data
+    orchestrator._load_data = lambda *args: calls.append(args) or load(*args)
+
+    first = orchestrator.generate_signals(symbol="GOLD-BTC", interval="1h")
+    second = orchestrator.generate_signals(symbol="GOLD-BTC", interval="1h")
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(first, second)
+    # Las categorías son internas: los llamadores reciben symbol/interval como object, igual que desde DuckDB.
+    assert first["symbol"].dtype == object and first["interval"].dtype == object
+    assert isinstance(next(iter(orchestrator._cache.values()))["symbol"].dtype, pd.CategoricalDtype)
+
+    # La conexión de solo lectura compartida cede ante la escritura sin cerrar el orquestador.
+    with exclusive_write_access(populated_db_path), duckdb.connect(database=str(populated_db_path)) as con:
+        con.execute("UPDATE klines SET volume = volume + 1")
+    orchestrator.generate_signals(symbol="GOLD-BTC", interval="1h")
+    assert len(calls) == 2
+    orchestrator.close()
+
+def test_generate_signals_many_loads_all_pairs_in_one_query(populated_db_path: Path):
+    """Verifica que varios pares se cargan con una sola consulta y dan el mismo resultado que por separado."""
+    orchestrator = SignalOrchestrator(db_path=populated_db_path, config={})
+    expected = orchestrator.generate_signals(symbol="GOLD-BTC", interval="1h")
+    orchestrator._cache.clear()
+    orchestrator._load_data = lambda *args: pytest.fail("No debe consultarse cada par por separado")
+
+    results = orchestrator.generate_signals_many([("GOLD-BTC", "1h"), ("GOLD-BTC", "4h")])
+
+    pd.testing.assert_frame_equal(results[("GOLD-BTC", "1h")], expected)
+    assert results[("GOLD-BTC", "4h")].empty
+
+    # Un par servido desde la caché pasa al final del orden LRU y sobrevive a las inserciones siguientes.
+    orchestrator.CACHE_SIZE = 3
+    orchestrator.generate_signals_many([("GOLD-BTC", "1d")])
+    orchestrator.generate_signals_many([("GOLD-BTC", "1h")])
+    orchestrator.generate_signals_many([("GOLD-BTC", "1w"), ("GOLD-BTC", "1M")])
+    assert [key[:2] for key in orchestrator._cache] == [("GOLD-BTC", "1h"), ("GOLD-BTC", "1w"), ("GOLD-BTC", "1M")]
+    orchestrator.close()